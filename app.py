@@ -1,13 +1,26 @@
 import streamlit as st
 from datetime import datetime
 import cv2
-import tempfile
 import pandas as pd
-from ultralytics import YOLO
 import numpy as np
 from PIL import Image
 import os
-import random
+from time import perf_counter, sleep
+
+from backends import DEFAULT_BACKEND, available_backends, export_ready, start_export
+from model_registry import available_weights, get_model, resolve_weights, DEFAULT_WEIGHTS
+from live_pipeline import LivePipeline, MotionGate
+from multi_camera import MultiCameraMonitor, parse_sources
+from tracking import SessionTracker
+from inference_service import RemoteModel
+from detection import PPE_OPTIONS, PROFILE, annotate, build_ppe_table, build_ppe_table_from_ids, detect_batch_cached, detect_cached, frame_summary, draw_workers, model_identity, ppe_table
+from upload_store import store_upload
+from image_export import IMAGE_FORMATS, encode_async, export_async
+from preview import detections_in_full, detections_in_preview, load_full_image, model_input_size, prepare_upload
+from person_ppe import detects_people, person_compliance, person_detector
+from reporting import build_narratives, generate_pdf_report
+from observation_store import load_thumbnail, query_observations, save_observation
+from video_io import classes_present, keyframe_sampling_available, presence_table, scan_video, take_random_frames
 
 
 # Initialize session state
@@ -29,8 +42,8 @@ if "near_miss" not in st.session_state:
 if "report_generated" not in st.session_state:
     st.session_state.report_generated = False
 
-if "pdf_filename" not in st.session_state:
-    st.session_state.pdf_filename = None
+if "pdf_bytes" not in st.session_state:
+    st.session_state.pdf_bytes = None
 
 # Initialize session state for date, time, and location
 if "date" not in st.session_state:
@@ -42,175 +55,342 @@ if "time" not in st.session_state:
 if "location" not in st.session_state:
     st.session_state.location = "Site A"  # Default location
 
-from reportlab.lib.pagesizes import A4
-from reportlab.lib import colors
-from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle
-from datetime import datetime
-from reportlab.lib.enums import TA_LEFT, TA_CENTER
-from reportlab.platypus import Spacer
-
-def generate_pdf_report(date, time, location, ppe_df, description, intervention, positive_behaviour, near_miss, supervisor_name):
-    # Create a temporary file for the PDF
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp_file:
-        pdf_filename = tmp_file.name
-
-    # Create the PDF file
-    doc = SimpleDocTemplate(pdf_filename, pagesize=A4)
-
-    # Create a list to hold the content of the PDF
-    content = []
-
-    # Define styles
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        name='Title',
-        fontSize=18,
-        leading=22,
-        alignment=1,  # Center alignment
-        borderWidth=2,  # Add a 2-point border
-        borderPadding=4,
-        backColor=colors.darkgrey,
-        borderColor=colors.black,
-    )
-    para_style = ParagraphStyle(
-        name='Para',
-        fontSize=12,
-        leading=16,
-        alignment=4,
-        borderWidth=1,  # Add a 1-point border
-        borderColor=colors.black,
-        backColor=colors.lightgrey,
-        borderPadding=4,
-    )
-    instruction = ParagraphStyle(
-        name='Instruction',
-        fontSize=11,
-        leading=16,
-        alignment=4,
-        fontName='Helvetica-Oblique',
-        borderWidth=1,  # Add a 1-point border
-        borderColor=colors.black,
-        backColor=colors.lightgrey,
-        borderPadding=4,
-    )
-    heading_style = styles['Heading2']
-    # Define a custom style for date, time, and location
-    highlight_style = ParagraphStyle(
-        name='Highlight',
-        parent=styles['Normal'],  # Inherit from the normal style
-        fontSize=14,              # Larger font size
-        textColor=colors.darkblue,  # Dark blue text color
-        fontName='Helvetica-Bold',  # Bold font
-        spaceAfter=12,            # Add space after the paragraph
-    )
+# Annotated image and detected classes of the current observation (saved with the report)
+if "observation_image" not in st.session_state:
+    st.session_state.observation_image = None
+
+if "observation_classes" not in st.session_state:
+    st.session_state.observation_classes = []
 
-    # Add title
-    content.append(Paragraph("Safety Observation Card", title_style))
-
-    # Add a spacer to create some space
-    content.append(Spacer(1, 12))  # 1 inch, 12 points
-
-    # Add instructions
-    content.append(Paragraph("Instructions: The Safety Observation Card instructions involve informing the worker and completing the checklist prior to observation. Post-observation, review positive safety behaviors and discuss areas for improvement.", instruction))
-
-    # Add a spacer to create some space
-    content.append(Spacer(1, 12))  # 1 inch, 12 points
-
-    # Add date, time, and location with emojis and custom style
-    content.append(Paragraph(f"📅 <b>Date:</b> {date}", highlight_style))
-    content.append(Spacer(1, 12))  # Add a spacer for better spacing
-
-    content.append(Paragraph(f"⏰ <b>Time:</b> {time}", highlight_style))
-    content.append(Spacer(1, 12))  # Add a spacer for better spacing
-
-    content.append(Paragraph(f"📍 <b>Location:</b> {location}", highlight_style))
-    content.append(Spacer(1, 12))  # Add a spacer for better spacing
-    # Add a spacer to create some space
-    content.append(Spacer(1, 12))  # 1 inch, 12 points
-
-    # Add PPE checklist table
-    content.append(Paragraph("Personal Protective Equipment Checklist", title_style))
-
-    # Add a spacer to create some space
-    content.append(Spacer(1, 12))  # 1 inch, 12 points
-
-    # Convert the DataFrame to a list of lists for the table
-    ppe_data_with_numbers = [["No."] + ppe_df.columns.tolist()] + [[i+1] + row for i, row in enumerate(ppe_df.values.tolist())]
-
-    # Create the table
-    ppe_table = Table(ppe_data_with_numbers, colWidths=['10%'] + ['25%'] + ['25%'] + ['*'] * (len(ppe_data_with_numbers[0]) - 4), rowHeights=[25] * len(ppe_data_with_numbers))
-    ppe_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey), 
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), 
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'), 
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'), 
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12), 
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige), 
-        ('GRID', (0, 0), (-1, -1), 1, colors.black), 
-        ('FONTSIZE', (0, 0), (-1, -1), 12), 
-    ]))
-    content.append(ppe_table)
-    # Add observation description
-    content.append(Paragraph("Observation Description:", heading_style))
-    content.append(Paragraph(description, para_style))
-
-    # Add recommended interventions
-    content.append(Paragraph("Recommended Interventions:", heading_style))
-    content.append(Paragraph(intervention, para_style))
-
-    # Add positive safety behaviors
-    content.append(Paragraph("Positive Safety Behaviors:", heading_style))
-    content.append(Paragraph(positive_behaviour, para_style))
-
-    # Add identified near misses
-    content.append(Paragraph("Identified Near Misses:", heading_style))
-    content.append(Paragraph(near_miss, para_style))
-
-    # Add supervisor name
-    content.append(Paragraph("Supervisor Name:", heading_style))
-    content.append(Paragraph(supervisor_name, para_style))
-
-    # Build the PDF
-    doc.build(content)
-
-    # Return the full path of the saved PDF file
-    return pdf_filename
-
-    
-# Load the YOLOv8 model
-model = YOLO("my_model.pt")
-
-# Define class colors
-class_colors = {
-    "hairnet": (255, 0, 0),    # Blue
-    "goggles": (255, 255, 255), # White
-    "mask": (0, 0, 255),        # Red
-    "full-body suit": (0, 255, 0), # Green
-    "gloves": (42, 42, 165),    # Brown
-    "shoes": (0, 0, 0)          # Black
-}
-
-def capture_frame(video_path):
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    cap.set(cv2.CAP_PROP_POS_FRAMES, total_frames - 1)  # Go to last frame
-    ret, frame = cap.read()
-    cap.release()
-    return frame if ret else None
-
-def take_random_frames(video_path, num_frames=5):
-    cap = cv2.VideoCapture(video_path)
-    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-    frames = []
-    for _ in range(num_frames):
-        frame_id = random.randint(0, total_frames - 1)
-        cap.set(cv2.CAP_PROP_POS_FRAMES, frame_id)
-        ret, frame = cap.read()
-        if ret:
-            frames.append(frame)
-    cap.release()
-    return frames
+
+
+def frame_sampling_options():
+    # Seed and fast mode for "Take Batches from Video"
+    with st.expander("Frame sampling options"):
+        reproducible = st.checkbox("Reproducible sampling", value=False)
+        seed = st.number_input("Sampling seed", min_value=0, value=0, step=1, disabled=not reproducible)
+        keyframes_only = st.checkbox(
+            "Fast mode (keyframes only)",
+            value=False,
+            disabled=not keyframe_sampling_available(),
+            help="Requires PyAV (pip install av).",
+        )
+    return (int(seed) if reproducible else None), keyframes_only
+
+def live_detection_options():
+    # How often the live loop runs the model
+    with st.expander("Live detection options"):
+        detect_every = st.slider("Run full detection every N frames", min_value=1, max_value=15, value=5,
+                                 help="Boxes are tracked between detections.")
+        motion_threshold = st.slider("Motion threshold", min_value=0.0, max_value=20.0, value=2.0, step=0.5,
+                                     help="Frames that differ less than this from the last processed frame reuse its boxes. 0 turns the gate off.")
+        max_staleness = st.slider("Maximum staleness (seconds)", min_value=0.5, max_value=30.0, value=2.0, step=0.5,
+                                  help="Run the model at least this often, even in a static scene.")
+
+        # What is sent to the browser, independent of how often the model runs
+        live_view = {
+            "display_fps": st.slider("Live view refresh rate (FPS)", min_value=1, max_value=30, value=10),
+            "display_width": st.select_slider("Live view width (px)", options=[320, 480, 640, 960, 1280], value=640),
+            "jpeg_quality": st.slider("Live view JPEG quality", min_value=30, max_value=95, value=70),
+        }
+    gate = MotionGate(motion_threshold, max_staleness) if motion_threshold > 0 else None
+    return detect_every, gate, live_view
+
+def video_frame_results():
+    # Cached detections for the sampled video frames, dropped when the model changes
+    if st.session_state.get("frame_results_model") != model.weights_key:
+        st.session_state.frame_results = {}
+        st.session_state.frame_results_model = model.weights_key
+    return st.session_state.frame_results
+
+def detect_video_frames(frame_indices):
+    # Detect objects on several sampled frames with batched model calls and cache
+    # the annotated frame and detected classes for each frame index
+    frame_results = video_frame_results()
+    frame_indices = list(frame_indices)
+    images = [cv2.cvtColor(st.session_state.frames[i], cv2.COLOR_BGR2RGB) for i in frame_indices]
+    # Frames detected before (with the same model) come from the shared detection cache
+    batch_detections = detect_batch_cached(model, images)
+
+    for frame_index, image_np, detections in zip(frame_indices, images, batch_detections):
+        detected_classes = annotate(image_np, detections, model.names)
+
+        frame_results[frame_index] = {"image": image_np, "classes": detected_classes}
+
+def select_frame(frame_index):
+    st.session_state.selected_frame = frame_index
+
+def show_frame_summary():
+    frame_results = video_frame_results()
+    if not frame_results:
+        return
+
+    summary = frame_summary({i: frame_results[i]["classes"] for i in sorted(frame_results)}, sections)
+    st.write("PPE summary per frame:")
+    st.dataframe(summary.set_index("Frame"), use_container_width=True)
+
+    # Jump straight to the frame with the fewest / most unsafe items
+    best_frame = int(summary["Unsafe items"].idxmin())
+    worst_frame = int(summary["Unsafe items"].idxmax())
+    col_best, col_worst = st.columns(2)
+    with col_best:
+        st.button(f"Go to best frame (Frame {best_frame + 1})", on_click=select_frame, args=(best_frame,))
+    with col_worst:
+        st.button(f"Go to worst frame (Frame {worst_frame + 1})", on_click=select_frame, args=(worst_frame,))
+
+def show_video_scan(video_path, video_id):
+    with st.expander("Scan whole video"):
+        stride = st.number_input("Analyse every Nth frame", min_value=1, value=10, step=1)
+        min_presence = st.slider("Mark PPE as Safe when present in at least (% of frames)", 0, 100, 80)
+
+        if st.button("Scan whole video"):
+            progress_bar = st.progress(0.0, text="Scanning video...")
+            try:
+                scan = scan_video(
+                    model,
+                    video_path,
+                    stride=int(stride),
+                    progress=lambda fraction: progress_bar.progress(fraction, text=f"Scanning video... {fraction:.0%}"),
+                )
+            except Exception as e:
+                st.error(f"An error occurred during model inference or video processing: {e}")
+                return
+            scan["video_id"] = video_id
+            scan["min_presence"] = None
+            st.session_state.video_scan = scan
+
+    scan = st.session_state.get("video_scan")
+    if scan is None or scan["video_id"] != video_id:
+        return
+
+    st.write(f"Scanned {scan['frames_scanned']} of {scan['total_frames']} frames (every {scan['stride']}th frame).")
+    st.table(presence_table(scan))
+
+    # Fill the PPE checklist from the temporal statistics (again whenever the threshold changes)
+    if scan["min_presence"] != min_presence:
+        scan["min_presence"] = min_presence
+        detected_classes = classes_present(scan, min_fraction=min_presence / 100)
+        remember_detection(None, detected_classes)
+        st.session_state.ppe_df = build_ppe_table(detected_classes, sections)
+        st.session_state.detect_objects_pressed = True
+    st.table(st.session_state.ppe_df)
+
+def remember_detection(image_rgb, detected_classes):
+    st.session_state.observation_image = image_rgb
+    st.session_state.observation_classes = sorted(set(detected_classes))
+
+def save_current_observation(supervisor_name):
+    # Persist the submitted observation so it outlives the browser tab
+    try:
+        save_observation(
+            date=st.session_state.date.strftime("%Y-%m-%d"),
+            time=st.session_state.time.strftime("%I:%M %p"),
+            location=st.session_state.location,
+            supervisor=supervisor_name,
+            ppe_df=st.session_state.ppe_df,
+            description=st.session_state.description,
+            intervention=st.session_state.intervention,
+            positive_behaviour=st.session_state.positive_behaviour,
+            near_miss=st.session_state.near_miss,
+            detections=st.session_state.observation_classes,
+            image=st.session_state.observation_image,
+            source=source,
+        )
+    except Exception as e:
+        st.warning(f"The report was generated but could not be saved: {e}")
+
+def show_observation_history():
+    # Filtered view of saved observations; only matching rows are read from the store
+    with st.expander("Saved Observations"):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            location = st.text_input("Location", key="history_location")
+            supervisor = st.text_input("Supervisor", key="history_supervisor")
+        with col2:
+            checklist = st.selectbox("PPE item", ["Any"] + PPE_OPTIONS, key="history_checklist")
+            status = st.selectbox("Status", ["Any", "Safe", "Unsafe", "N/A"], key="history_status")
+        with col3:
+            date_from = st.date_input("From", value=None, key="history_from")
+            date_to = st.date_input("To", value=None, key="history_to")
+
+        observations = query_observations(
+            location=location or None,
+            supervisor=supervisor or None,
+            date_from=date_from,
+            date_to=date_to,
+            checklist=None if checklist == "Any" else checklist,
+            status=None if status == "Any" else status,
+        )
+        st.dataframe(observations, hide_index=True)
+
+        if not observations.empty:
+            observation_id = st.selectbox("Show thumbnail of observation", observations["id"], key="history_id")
+            thumbnail = load_thumbnail(int(observation_id))
+            if thumbnail is not None:
+                st.image(thumbnail, width=320)
+
+def show_person_compliance(image, detections):
+    # Per-worker checklist: one gloved worker no longer makes the whole frame "Safe"
+    person_model = person_detector()
+    workers, counts, person_boxes = person_compliance(detections, model.names, sections, image=image, person_model=person_model)
+    if workers.empty:
+        st.info("No workers found in this image.")
+        return
+    if not detects_people(model.names, person_model):
+        st.caption("This model has no person class, so workers are estimated by grouping PPE items that sit in the "
+                   "same column of the image. Set BANTAI_PERSON_WEIGHTS to a person detector for reliable results.")
+
+    marked = np.ascontiguousarray(image).copy()
+    draw_workers(marked, enumerate(person_boxes, start=1))
+
+    compliant = int((workers["Compliant"] == "Yes").sum())
+    st.subheader(f"Per-person check: {compliant} of {len(workers)} workers fully compliant")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.image(marked, caption="Workers", width=400)
+    with col2:
+        st.table(counts)
+    st.table(workers)
+
+def show_session_workers(tracker):
+    # PPE status of every worker tracked during the live session
+    worker_statuses = tracker.worker_statuses(sections)
+    if not worker_statuses:
+        return
+    workers = pd.DataFrame(list(worker_statuses.values()), columns=PROFILE.ppe_items,
+                           index=[f"Worker {worker_id}" for worker_id in worker_statuses])
+    workers.index.name = "Worker"
+    st.subheader(f"Live session: {len(workers)} workers tracked over {tracker.rounds} detection rounds")
+    st.table(workers)
+
+def stop_multi_camera():
+    monitor = st.session_state.get("multi_camera")
+    if monitor is not None:
+        monitor.stop()
+        st.session_state.multi_camera = None
+
+def run_multi_camera(monitor, grid_columns):
+    # Grid view: one tile per source, refreshed as the shared inference worker delivers results
+    tiles = []
+    for _ in range(0, len(monitor.sources), grid_columns):
+        tiles.extend(column.empty() for column in st.columns(grid_columns))
+    stats_placeholder = st.empty()
+
+    last_stats = 0.0
+    while monitor.running:
+        updated = False
+        for source, tile in zip(monitor.sources, tiles):
+            item = source.latest()
+            if item is None:
+                continue
+            frame_rgb, detections = item
+            annotate(frame_rgb, detections, model.names)
+            tile.image(frame_rgb, caption=source.name, use_column_width=True)
+            updated = True
+
+        if perf_counter() - last_stats > 1.0:
+            stats_placeholder.table(pd.DataFrame(monitor.stats()).set_index("Source"))
+            last_stats = perf_counter()
+        if not updated:
+            sleep(0.01)
+
+    if monitor.error:
+        st.error(monitor.error)
+    stats_placeholder.table(pd.DataFrame(monitor.stats()).set_index("Source"))
+
+# Image downloads started during this script run; their buttons are filled in by
+# finish_image_downloads() at the end of the run, so encoding overlaps with drawing the page
+pending_downloads = []
+
+def start_image_download(image_rgb):
+    # Encode the annotated image in the background
+    pending_downloads.append((st.empty(), encode_async(image_rgb, download_format, download_quality)))
+
+def start_original_download(uploaded_file, prepared, detections):
+    # Full-resolution export of an uploaded photo: decoding the original and drawing the
+    # boxes mapped back to its coordinates happen only here, in the background
+    data = uploaded_file.getvalue()
+    full_detections = detections_in_full(prepared, detections)
+
+    def make_image():
+        image = load_full_image(data)
+        annotate(image, full_detections, model.names)
+        return image
+
+    key = f"{prepared['key']}|{model_identity(model)}"
+    pending_downloads.append((st.empty(), export_async(key, make_image, download_format, download_quality)))
+
+def finish_image_downloads():
+    # Called last in the script run: only now wait for the encoders
+    for slot, future in pending_downloads:
+        try:
+            data, mime, extension = future.result()
+        except Exception as e:
+            slot.error(f"Could not prepare the image download: {e}")
+            continue
+        slot.download_button(
+            label="Download Image with Bounding Boxes",
+            data=data,
+            file_name=f"detected_objects{extension}",
+            mime=mime,
+        )
+    pending_downloads.clear()
+
+def stop_live_pipeline():
+    # Stop a live pipeline left running by a previous script run
+    pipeline = st.session_state.get("live_pipeline")
+    if pipeline is not None:
+        pipeline.stop()
+        st.session_state.live_pipeline = None
+
+def run_live_detection(frame_placeholder, stats_placeholder):
+    stop_live_pipeline()
+    pipeline = LivePipeline(
+        st.session_state.cap, model,
+        tracker=st.session_state.get("session_tracker"),
+        gate=st.session_state.get("motion_gate"),
+        **st.session_state.get("live_view", {}),
+    ).start()
+    st.session_state.live_pipeline = pipeline
+
+    try:
+        while st.session_state.camera_running:
+            item = pipeline.get(timeout=1.0)
+            if item is None:
+                if not pipeline.running:
+                    st.error(pipeline.error or "Failed to capture frame")
+                    break
+                continue
+
+            render_start = perf_counter()
+            # Boxes are already drawn and the frame JPEG-encoded by the pipeline (detected classes are reset for each frame)
+            jpeg, detected_classes = item
+
+            # Update session state and table
+            st.session_state.detected_classes = detected_classes
+            frame_placeholder.image(jpeg, use_column_width=True)
+
+            pipeline.record_render(perf_counter() - render_start)
+            stats_placeholder.caption(pipeline.stats_text())
+    finally:
+        # Also runs when a button click interrupts this script run
+        pipeline.stop()
+
+def load_model(weights_file, backend):
+    # Exported backends are prepared in the background on first use; PyTorch serves until then
+    if not export_ready(resolve_weights(weights_file), backend):
+        export = start_export(resolve_weights(weights_file), backend)
+        if not export.done():
+            st.info(f"Preparing the {backend} model for {weights_file}; using PyTorch until it is ready.")
+            return get_model(weights_file, "pytorch")
+        if export.exception() is not None:
+            st.error(f"Could not export {weights_file} to {backend}: {export.exception()}. Using PyTorch instead.")
+            return get_model(weights_file, "pytorch")
+    try:
+        return get_model(weights_file, backend)
+    except Exception as e:
+        st.error(f"Could not load the {backend} model: {e}. Using PyTorch instead.")
+        return get_model(weights_file, "pytorch")
 
 if "current_source" not in st.session_state:
     st.session_state.current_source = "Image"
@@ -229,7 +409,7 @@ with st.sidebar:
     st.subheader("Select Source")
     source = st.radio(
         "Choose a source:",
-        options=["Image", "Video", "Webcam"],
+        options=["Image", "Video", "Webcam", "Multi-camera"],
         index=0  # Default selection
     )
 
@@ -245,18 +425,51 @@ with st.sidebar:
     st.subheader("Select Section")
     sections = st.multiselect(
         "Choose sections to analyze:",
-        options=["Head", "Face", "Eyes", "Hand", "Body", "Foot", "All"],
+        options=PROFILE.section_names + ["All"],
         default=["All"]  # Default selection
     )
 
     # If "All" is selected, automatically select all sections
     if "All" in sections:
-        sections = ["Head", "Face", "Eyes", "Hand", "Body", "Foot"]
+        sections = PROFILE.section_names
+
+    # Format of the annotated image download
+    st.subheader("Image Download")
+    download_format = st.selectbox("Format:", options=list(IMAGE_FORMATS), index=0,
+                                   help="PNG keeps every pixel for the archive; JPEG and WebP are much smaller.")
+    download_quality = st.slider("Quality:", min_value=50, max_value=100, value=90, disabled=download_format == "PNG")
+
+    # Check PPE per worker instead of per frame
+    per_person = st.checkbox("Check PPE per person", value=False, help="Assign each PPE item to the worker wearing it")
+
+    # Section 4: Select Model (weights are loaded once per server process and shared)
+    st.subheader("Select Model")
+    weights_options = available_weights()
+    weights_file = st.selectbox(
+        "Choose model weights:",
+        options=weights_options,
+        index=weights_options.index(DEFAULT_WEIGHTS) if DEFAULT_WEIGHTS in weights_options else 0,
+    )
+    # Reduced-precision variants are faster on CPU; see benchmark_models.py for what they cost in accuracy.
+    # Only backends whose runtime is installed are offered.
+    backend_options = available_backends()
+    backend = st.selectbox(
+        "Inference backend:",
+        options=backend_options,
+        index=backend_options.index(DEFAULT_BACKEND) if DEFAULT_BACKEND in backend_options else 0,
+        help="onnx-int8 and openvino-fp16 are quantized variants of the selected weights, exported on first use.",
+        disabled=bool(os.environ.get("BANTAI_INFERENCE_URL")),
+    )
 
     # Optional: Add a "Created by" section
     st.markdown("---")  # Horizontal line for separation
     st.markdown("Created by: M Muddassir Saleem")
 
+# Load the YOLOv8 model from the shared registry (no reload on reruns), or use the
+# local inference service when one is configured so all sessions share one batched model
+inference_url = os.environ.get("BANTAI_INFERENCE_URL")
+model = RemoteModel(inference_url, weights_file) if inference_url else load_model(weights_file, backend)
+
 # Main Content Area
 st.markdown(
     """<div style="text-align: center; font-size: 28px; font-weight: bold; border: 3px solid black; padding: 10px; margin-bottom: 10px;  background-color: lightgray;">Safety Observation Interface
@@ -273,110 +486,40 @@ if st.session_state.current_source != source:
     st.session_state.intervention = ""
     st.session_state.positive_behaviour = ""
     st.session_state.near_miss = ""
+    st.session_state.observation_image = None
+    st.session_state.observation_classes = []
     st.session_state.current_source = source
+    stop_multi_camera()
 
 # Define the function at the top of the code
 def generate_report_based_on_ppe_table(ppe_df, sections):
-    description_list = []
-    intervention_list = []
-    positive_behaviour_list = []
-    near_miss_list = []
-
-    # Extract PPE status from the table
-    for index, row in ppe_df.iterrows():
-        ppe_item = row["Checklist"]
-        section_name = ppe_item.split(" ")[0]  # Extract first word for category matching
-
-        if section_name in sections:
-            if row["Safe"] == "☑":
-                positive_behaviour_list.append(ppe_item)
-            elif row["Unsafe"] == "☑":
-                intervention_list.append(f"{ppe_item.lower()} should be provided")
-                near_miss_list.append(f"Potential risk due to missing {ppe_item.lower()}")
-            else:
-                description_list.append(f"{ppe_item} status unknown")
-
-    # Convert lists to formatted sentences (professional tone)
-    if description_list:
-        st.session_state.description = (
-            "During the site observation, workers were observed utilizing the following personal protective equipment (PPE): " 
-            + ", ".join(description_list) 
-            + ". However, it is essential to ensure that all required PPE is consistently worn to maintain safety standards."
-        )
-    else:
-        st.session_state.description = (
-            "All personnel were observed to be fully compliant with the required personal protective equipment (PPE) protocols. "
-            "This adherence to safety standards is commendable and contributes to a safer work environment."
-        )
-
-    if intervention_list:
-        st.session_state.intervention = (
-            "The following interventions are required to address PPE non-compliance: " 
-            + ", ".join(intervention_list) 
-            + ". Immediate action is recommended to mitigate potential hazards and ensure worker safety."
-        )
-    else:
-        st.session_state.intervention = (
-            "No interventions are currently required. All personnel are adhering to the prescribed PPE protocols, "
-            "which reflects a strong commitment to workplace safety."
-        )
-
-    if positive_behaviour_list:
-        st.session_state.positive_behaviour = (
-            "Positive safety behaviours were observed, including the proper use of the following PPE: " 
-            + ", ".join(positive_behaviour_list) 
-            + ". This demonstrates a proactive approach to safety and should be encouraged."
-        )
-    else:
-        st.session_state.positive_behaviour = (
-            "No specific positive behaviours related to PPE usage were recorded during this observation. "
-            "It is recommended to reinforce the importance of PPE compliance through regular training and reminders."
-        )
-
-    if near_miss_list:
-        st.session_state.near_miss = (
-            "The following near misses were identified due to missing or improper use of PPE: " 
-            + ", ".join(near_miss_list) 
-            + ". These incidents highlight potential risks that could lead to injuries or accidents. "
-            "Corrective measures should be implemented immediately."
-        )
-    else:
-        st.session_state.near_miss = (
-            "No near misses related to PPE usage were identified during this observation. "
-            "This indicates a strong safety culture and adherence to PPE protocols."
-        )
+    # Store the generated texts where the text areas and the PDF report read them
+    for field, text in build_narratives(ppe_df, sections).items():
+        st.session_state[field] = text
         
 if source == "Image":
     if option == "Automatic":
         uploaded_image = st.file_uploader("Upload an image", type=["jpg", "jpeg", "png"])
         if uploaded_image is not None:
-            image = Image.open(uploaded_image).convert("RGB")  # Ensure image is in RGB format
-            image_np = np.array(image)
+            # Downscaled preview and letterboxed model input, made once per upload
+            prepared = prepare_upload(uploaded_image, model_input_size(model))
+            image_np = prepared["preview"].copy()
 
             col1, col2 = st.columns(2)
 
             with col1:
-                st.image(image, caption="Uploaded Image", width=400)
+                st.image(prepared["preview"], caption="Uploaded Image", width=400)
 
             if st.button("Detect Objects"):
                 # Process the image with YOLOv8 model
                 try:
-                    results = model(image_np)
+                    # Cached by image content, model and parameters: repeat clicks skip inference
+                    detections = detect_cached(model, prepared["input"])
                     st.write("Model inference successful!")
 
-                    # Extract detected objects
-                    detected_classes = []
-                    for result in results:
-                        for box in result.boxes:
-                            class_id = int(box.cls)
-                            class_name = model.names[class_id]
-                            detected_classes.append(class_name)
-
-                            # Draw bounding boxes
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            color = class_colors.get(class_name, (0, 255, 0))  # Default to green if class not found
-                            cv2.rectangle(image_np, (x1, y1), (x2, y2), color, 2)
-                            cv2.putText(image_np, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                    # Extract detected objects (boxes drawn on the preview)
+                    detected_classes = annotate(image_np, detections_in_preview(prepared, detections), model.names)
+                    remember_detection(image_np, detected_classes)
 
                     # Display the image with bounding boxes
                     with col2:
@@ -384,16 +527,7 @@ if source == "Image":
                         st.session_state.detect_objects_pressed = True
 
                     # Provide a download link for the image with bounding boxes
-                    pil_image = Image.fromarray(image_np)
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                        pil_image.save(tmp_file.name)
-                        with open(tmp_file.name, "rb") as f:
-                            st.download_button(
-                                label="Download Image with Bounding Boxes",
-                                data=f,
-                                file_name="detected_objects.png",
-                                mime="image/png",
-                            )
+                    start_original_download(uploaded_image, prepared, detections)
 
                     # STOP Card Heading
                     st.markdown(
@@ -430,44 +564,7 @@ if source == "Image":
                     )
 
                     # Update the PPE table based on detected objects
-                    ppe_options = ["Head Protection", "Eyes Protection", "Face Protection", "Hand Protection", "Foot Protection", "Body Protection"]
-                    ppe_items = ["Hairnet", "Goggles", "Mask", "Gloves", "Shoes", "Full-body suit"]
-
-                    table_data = {
-                        "Checklist": ppe_options,
-                        "PPE": ppe_items,  # Add the new PPE column
-                        "N/A": ["☐"] * len(ppe_options),
-                        "Safe": ["☐"] * len(ppe_options),
-                        "Unsafe": ["☐"] * len(ppe_options),
-                    }
-
-                    for i, ppe in enumerate(ppe_options):
-                        section_name = ppe.split(" ")[0]
-                        if section_name in sections:
-                            if section_name == "Head" and "hairnet" in detected_classes:
-                                table_data["Safe"][i] = "☑"
-                            elif section_name == "Face" and "mask" in detected_classes:
-                                table_data["Safe"][i] = "☑"
-                            elif section_name == "Eyes" and "goggles" in detected_classes:
-                                table_data["Safe"][i] = "☑"
-                            elif section_name == "Hand" and "gloves" in detected_classes:
-                                table_data["Safe"][i] = "☑"
-                            elif section_name == "Body" and "full-body suit" in detected_classes:
-                                table_data["Safe"][i] = "☑"
-                            elif section_name == "Foot" and "shoes" in detected_classes:
-                                table_data["Safe"][i] = "☑"
-                            else:
-                                table_data["Unsafe"][i] = "☑"
-                        else:
-                            table_data["N/A"][i] = "☑"
-
-                    # Convert the table data into a DataFrame for better display
-                    st.session_state.ppe_df = pd.DataFrame(table_data)
-
-                    # Add this code here
-                    st.session_state.ppe_df = st.session_state.ppe_df.reset_index(drop=True)
-                    st.session_state.ppe_df.index += 1
-                    st.session_state.ppe_df.index.name = "No."
+                    st.session_state.ppe_df = build_ppe_table_from_ids(detections.cls, model.names, sections)
 
                     # Add color to the DataFrame
                     # st.session_state.ppe_df = st.session_state.ppe_df.style.set_properties(**{
@@ -506,80 +603,11 @@ if source == "Image":
 
                     # Display the table
                     st.table(st.session_state.ppe_df)
+                    if per_person:
+                        show_person_compliance(prepared["preview"], detections_in_preview(prepared, detections))
                 except Exception as e:
                     st.error(f"An error occurred during model inference or image processing: {e}")
 
-    # Function to generate dynamic descriptions, interventions, positive behaviour, and near misses
-    def generate_report_based_on_ppe_table(ppe_df, sections):
-        description_list = []
-        intervention_list = []
-        positive_behaviour_list = []
-        near_miss_list = []
-
-        # Extract PPE status from the table
-        for index, row in ppe_df.iterrows():
-            ppe_item = row["Checklist"]
-            section_name = ppe_item.split(" ")[0]  # Extract first word for category matching
-
-            if section_name in sections:
-                if row["Safe"] == "☑":
-                    positive_behaviour_list.append(ppe_item)
-                elif row["Unsafe"] == "☑":
-                    intervention_list.append(f"{ppe_item.lower()} should be provided")
-                    near_miss_list.append(f"Potential risk due to missing {ppe_item.lower()}")
-                else:
-                    description_list.append(f"{ppe_item} status unknown")
-
-        # Convert lists to formatted sentences (professional tone)
-        if description_list:
-            st.session_state.description = (
-                "During the site observation, workers were observed utilizing the following personal protective equipment (PPE): " 
-                + ", ".join(description_list) 
-                + ". However, it is essential to ensure that all required PPE is consistently worn to maintain safety standards."
-            )
-        else:
-            st.session_state.description = (
-                "All personnel were observed to be fully compliant with the required personal protective equipment (PPE) protocols. "
-                "This adherence to safety standards is commendable and contributes to a safer work environment."
-            )
-
-        if intervention_list:
-            st.session_state.intervention = (
-                "The following interventions are required to address PPE non-compliance: " 
-                + ", ".join(intervention_list) 
-                + ". Immediate action is recommended to mitigate potential hazards and ensure worker safety."
-            )
-        else:
-            st.session_state.intervention = (
-                "No interventions are currently required. All personnel are adhering to the prescribed PPE protocols, "
-                "which reflects a strong commitment to workplace safety."
-            )
-
-        if positive_behaviour_list:
-            st.session_state.positive_behaviour = (
-                "Positive safety behaviours were observed, including the proper use of the following PPE: " 
-                + ", ".join(positive_behaviour_list) 
-                + ". This demonstrates a proactive approach to safety and should be encouraged."
-            )
-        else:
-            st.session_state.positive_behaviour = (
-                "No specific positive behaviours related to PPE usage were recorded during this observation. "
-                "It is recommended to reinforce the importance of PPE compliance through regular training and reminders."
-            )
-
-        if near_miss_list:
-            st.session_state.near_miss = (
-                "The following near misses were identified due to missing or improper use of PPE: " 
-                + ", ".join(near_miss_list) 
-                + ". These incidents highlight potential risks that could lead to injuries or accidents. "
-                "Corrective measures should be implemented immediately."
-            )
-        else:
-            st.session_state.near_miss = (
-                "No near misses related to PPE usage were identified during this observation. "
-                "This indicates a strong safety culture and adherence to PPE protocols."
-            )
-
     # Add this after the PPE table is displayed in the "Image", "Video", or "Webcam" sections
     if st.session_state.ppe_df is not None:
         generate_report_based_on_ppe_table(st.session_state.ppe_df, sections)
@@ -630,7 +658,7 @@ if source == "Image":
         # Add a Generate Report button
         if st.button("Generate Safety Report"):
             # Generate the PDF
-            st.session_state.pdf_filename = generate_pdf_report(
+            st.session_state.pdf_bytes = generate_pdf_report(
                 date=st.session_state.date.strftime("%Y-%m-%d"),
                 time=st.session_state.time.strftime("%I:%M %p"),
                 location=st.session_state.location,
@@ -642,80 +670,60 @@ if source == "Image":
                 supervisor_name=supervisor_name
             )
 
+            # Keep the observation after the tab is closed
+            save_current_observation(supervisor_name)
+
             # Set session state to indicate report has been generated
-            if st.session_state.pdf_filename:
+            if st.session_state.pdf_bytes:
                 st.session_state.report_generated = True
 
-        # Check if the report has been generated and the filename is valid
-        if st.session_state.report_generated and st.session_state.pdf_filename:
+        # Check if the report has been generated
+        if st.session_state.report_generated and st.session_state.pdf_bytes:
             st.success("Safety report generated and submitted successfully!")
             
             # Provide a download link for the PDF
-            try:
-                with open(st.session_state.pdf_filename, "rb") as f:
-                    st.download_button(
-                        label="Download Safety Observation Card (PDF)",
-                        data=f,
-                        file_name=os.path.basename(st.session_state.pdf_filename),  # Use the filename only
-                        mime="application/pdf",
-                    )
-            except FileNotFoundError:
-                st.error("The report file was not found. Please generate the report again.")
-            except Exception as e:
-                st.error(f"An error occurred while opening the report file: {e}")
+            st.download_button(
+                label="Download Safety Observation Card (PDF)",
+                data=st.session_state.pdf_bytes,
+                file_name="safety_observation_card.pdf",
+                mime="application/pdf",
+            )
 
             # Reset the session state (optional)
             st.session_state.report_generated = False
-            st.session_state.pdf_filename = None
+            st.session_state.pdf_bytes = None
 
 
     # Manual Code
     elif option == "Manual":
         uploaded_image = st.file_uploader("Upload an image", type=["jpg", "jpeg", "png"])
         if uploaded_image is not None:
-            image = Image.open(uploaded_image).convert("RGB")  # Ensure image is in RGB format
-            image_np = np.array(image)
+            # Downscaled preview and letterboxed model input, made once per upload
+            prepared = prepare_upload(uploaded_image, model_input_size(model))
+            image_np = prepared["preview"].copy()
 
             col1, col2 = st.columns(2)
 
             with col1:
-                st.image(image, caption="Uploaded Image", width=400)
+                st.image(prepared["preview"], caption="Uploaded Image", width=400)
 
             if st.button("Detect Objects"):
                 # Process the image with YOLOv8 model
                 try:
-                    results = model(image_np)
+                    # Cached by image content, model and parameters: repeat clicks skip inference
+                    detections = detect_cached(model, prepared["input"])
                     st.write("Model inference successful!")
 
-                    # Extract detected objects
-                    detected_classes = []
-                    for result in results:
-                        for box in result.boxes:
-                            class_id = int(box.cls)
-                            class_name = model.names[class_id]
-                            detected_classes.append(class_name)
-
-                            # Draw bounding boxes
-                            x1, y1, x2, y2 = map(int, box.xyxy[0])
-                            color = class_colors.get(class_name, (0, 255, 0))  # Default to green if class not found
-                            cv2.rectangle(image_np, (x1, y1), (x2, y2), color, 2)
-                            cv2.putText(image_np, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                    # Extract detected objects (boxes drawn on the preview)
+                    detected_classes = annotate(image_np, detections_in_preview(prepared, detections), model.names)
+                    remember_detection(image_np, detected_classes)
 
                     # Display the image with bounding boxes
                     with col2:
                         st.image(image_np, caption="Detected Objects", width=400)
 
                     # Provide a download link for the image with bounding boxes
-                    pil_image = Image.fromarray(image_np)
-                    with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                        pil_image.save(tmp_file.name)
-                        with open(tmp_file.name, "rb") as f:
-                            st.download_button(
-                                label="Download Image with Bounding Boxes",
-                                data=f,
-                                file_name="detected_objects.png",
-                                mime="image/png",
-                            )
+                    start_original_download(uploaded_image, prepared, detections)
                 except Exception as e:
                     st.error(f"An error occurred during model inference or image processing: {e}")
 
@@ -858,7 +866,7 @@ if source == "Image":
                 st.session_state.near_miss = near_miss_text
 
                 # Generate the PDF
-                st.session_state.pdf_filename = generate_pdf_report(
+                st.session_state.pdf_bytes = generate_pdf_report(
                     date=st.session_state.date.strftime("%Y-%m-%d"),
                     time=st.session_state.time.strftime("%I:%M %p"),
                     location=st.session_state.location,
@@ -870,49 +878,60 @@ if source == "Image":
                     supervisor_name=supervisor_name
                 )
 
+                # Keep the observation after the tab is closed
+                save_current_observation(supervisor_name)
+
                 # Set session state to indicate report has been generated
-                if st.session_state.pdf_filename:
+                if st.session_state.pdf_bytes:
                     st.session_state.report_generated = True
 
-            # Check if the report has been generated and the filename is valid
-            if st.session_state.report_generated and st.session_state.pdf_filename:
+            # Check if the report has been generated
+            if st.session_state.report_generated and st.session_state.pdf_bytes:
                 st.success("Safety report generated and submitted successfully!")
                 
                 # Provide a download link for the PDF
-                try:
-                    with open(st.session_state.pdf_filename, "rb") as f:
-                        st.download_button(
-                            label="Download Safety Observation Card (PDF)",
-                            data=f,
-                            file_name=os.path.basename(st.session_state.pdf_filename),  # Use the filename only
-                            mime="application/pdf",
-                        )
-                except FileNotFoundError:
-                    st.error("The report file was not found. Please generate the report again.")
-                except Exception as e:
-                    st.error(f"An error occurred while opening the report file: {e}")
+                st.download_button(
+                    label="Download Safety Observation Card (PDF)",
+                    data=st.session_state.pdf_bytes,
+                    file_name="safety_observation_card.pdf",
+                    mime="application/pdf",
+                )
 
                 # Reset the session state (optional)
                 st.session_state.report_generated = False
-                st.session_state.pdf_filename = None
+                st.session_state.pdf_bytes = None
 
 elif source == "Video":
     if option == "Automatic":
         uploaded_video = st.file_uploader("Upload a video", type=["mp4", "avi", "mov"])
         if uploaded_video is not None:
-            # Save the uploaded video to a temporary file
-            tfile = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-            tfile.write(uploaded_video.read())
-            st.video(tfile.name, format="video/mp4", start_time=0)
+            # Store the uploaded video on disk once (deduplicated by content and reused across reruns)
+            video_path = store_upload(uploaded_video)
+            st.video(video_path, format="video/mp4", start_time=0)
+
+            # Judge the whole clip instead of a single sampled frame
+            show_video_scan(video_path, os.path.basename(video_path))
             
+        sampling_seed, keyframes_only = frame_sampling_options()
         if st.button("Take Batches from Video"):
-            frames = take_random_frames(tfile.name, num_frames=8)
+            frames = take_random_frames(video_path, num_frames=8, seed=sampling_seed, keyframes_only=keyframes_only)
 
             if frames:
                 st.session_state.frames = frames  # Store frames persistently
                 st.session_state.selected_frame = 0  # Default frame selection
+                st.session_state.frame_results = {}  # Detections are cached per frame index
 
         if "frames" in st.session_state and st.session_state.frames:
+            # Run detection on every sampled frame at once
+            if st.button("Detect All Frames"):
+                try:
+                    detect_video_frames(range(len(st.session_state.frames)))
+                except Exception as e:
+                    st.error(f"An error occurred during model inference or image processing: {e}")
+
+            # Per-frame PPE summary from the cached detections
+            show_frame_summary()
+
             st.write("Select a frame for detection:")
 
             # Use session state to remember the selected frame
@@ -943,36 +962,22 @@ elif source == "Video":
                 if st.button("Detect Objects"):
                     # Process the image with YOLOv8 model
                     try:
-                        results = model(image_np)
+                        # Reuse the cached detections if this frame was already processed
+                        frame_results = video_frame_results()
+                        if st.session_state.selected_frame not in frame_results:
+                            detect_video_frames([st.session_state.selected_frame])
                         st.write("Model inference successful!")
 
-                        detected_classes = []
-                        for result in results:
-                            for box in result.boxes:
-                                class_id = int(box.cls)
-                                class_name = model.names[class_id]
-                                detected_classes.append(class_name)
-
-                                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                                color = class_colors.get(class_name, (0, 255, 0))
-                                cv2.rectangle(image_np, (x1, y1), (x2, y2), color, 2)
-                                cv2.putText(image_np, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                        image_np = frame_results[st.session_state.selected_frame]["image"].copy()
+                        detected_classes = frame_results[st.session_state.selected_frame]["classes"]
+                        remember_detection(image_np, detected_classes)
 
                         # Display the detected image in the same row
                         with col2:
                             st.image(image_np, caption="Detected Objects", width=400)
 
                         # Provide a download link for the image with bounding boxes
-                        pil_image = Image.fromarray(image_np)
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                            pil_image.save(tmp_file.name)
-                            with open(tmp_file.name, "rb") as f:
-                                st.download_button(
-                                    label="Download Image with Bounding Boxes",
-                                    data=f,
-                                    file_name="detected_objects.png",
-                                    mime="image/png",
-                                )
+                        start_image_download(image_np)
 
                         # STOP Card Heading
                         st.markdown(
@@ -1009,44 +1014,7 @@ elif source == "Video":
                         )
 
                         # Update the PPE table based on detected objects
-                        ppe_options = ["Head Protection", "Eyes Protection", "Face Protection", "Hand Protection", "Foot Protection", "Body Protection"]
-                        ppe_items = ["Hairnet", "Goggles", "Mask", "Gloves", "Shoes", "Full-body suit"]
-
-                        table_data = {
-                            "Checklist": ppe_options,
-                            "PPE": ppe_items,  # Add the new PPE column
-                            "N/A": ["☐"] * len(ppe_options),
-                            "Safe": ["☐"] * len(ppe_options),
-                            "Unsafe": ["☐"] * len(ppe_options),
-                        }
-
-                        for i, ppe in enumerate(ppe_options):
-                            section_name = ppe.split(" ")[0]
-                            if section_name in sections:
-                                if section_name == "Head" and "hairnet" in detected_classes:
-                                    table_data["Safe"][i] = "☑"
-                                elif section_name == "Face" and "mask" in detected_classes:
-                                    table_data["Safe"][i] = "☑"
-                                elif section_name == "Eyes" and "goggles" in detected_classes:
-                                    table_data["Safe"][i] = "☑"
-                                elif section_name == "Hand" and "gloves" in detected_classes:
-                                    table_data["Safe"][i] = "☑"
-                                elif section_name == "Body" and "full-body suit" in detected_classes:
-                                    table_data["Safe"][i] = "☑"
-                                elif section_name == "Foot" and "shoes" in detected_classes:
-                                    table_data["Safe"][i] = "☑"
-                                else:
-                                    table_data["Unsafe"][i] = "☑"
-                            else:
-                                table_data["N/A"][i] = "☑"
-
-                        # Convert the table data into a DataFrame for better display
-                        st.session_state.ppe_df = pd.DataFrame(table_data)
-
-                        # Add this code here
-                        st.session_state.ppe_df = st.session_state.ppe_df.reset_index(drop=True)
-                        st.session_state.ppe_df.index += 1
-                        st.session_state.ppe_df.index.name = "No."
+                        st.session_state.ppe_df = build_ppe_table(detected_classes, sections)
 
                         # Add color to the DataFrame
                         # st.session_state.ppe_df = st.session_state.ppe_df.style.set_properties(**{
@@ -1082,77 +1050,6 @@ elif source == "Video":
                     except Exception as e:
                         st.error(f"An error occurred during model inference or image processing: {e}")
 
-    # Function to generate dynamic descriptions, interventions, positive behaviour, and near misses
-    def generate_report_based_on_ppe_table(ppe_df, sections):
-        description_list = []
-        intervention_list = []
-        positive_behaviour_list = []
-        near_miss_list = []
-
-        # Extract PPE status from the table
-        for index, row in ppe_df.iterrows():
-            ppe_item = row["Checklist"]
-            section_name = ppe_item.split(" ")[0]  # Extract first word for category matching
-
-            if section_name in sections:
-                if row["Safe"] == "☑":
-                    positive_behaviour_list.append(ppe_item)
-                elif row["Unsafe"] == "☑":
-                    intervention_list.append(f"{ppe_item.lower()} should be provided")
-                    near_miss_list.append(f"Potential risk due to missing {ppe_item.lower()}")
-                else:
-                    description_list.append(f"{ppe_item} status unknown")
-
-        # Convert lists to formatted sentences (professional tone)
-        if description_list:
-            st.session_state.description = (
-                "During the site observation, workers were observed utilizing the following personal protective equipment (PPE): " 
-                + ", ".join(description_list) 
-                + ". However, it is essential to ensure that all required PPE is consistently worn to maintain safety standards."
-            )
-        else:
-            st.session_state.description = (
-                "All personnel were observed to be fully compliant with the required personal protective equipment (PPE) protocols. "
-                "This adherence to safety standards is commendable and contributes to a safer work environment."
-            )
-
-        if intervention_list:
-            st.session_state.intervention = (
-                "The following interventions are required to address PPE non-compliance: " 
-                + ", ".join(intervention_list) 
-                + ". Immediate action is recommended to mitigate potential hazards and ensure worker safety."
-            )
-        else:
-            st.session_state.intervention = (
-                "No interventions are currently required. All personnel are adhering to the prescribed PPE protocols, "
-                "which reflects a strong commitment to workplace safety."
-            )
-
-        if positive_behaviour_list:
-            st.session_state.positive_behaviour = (
-                "Positive safety behaviours were observed, including the proper use of the following PPE: " 
-                + ", ".join(positive_behaviour_list) 
-                + ". This demonstrates a proactive approach to safety and should be encouraged."
-            )
-        else:
-            st.session_state.positive_behaviour = (
-                "No specific positive behaviours related to PPE usage were recorded during this observation. "
-                "It is recommended to reinforce the importance of PPE compliance through regular training and reminders."
-            )
-
-        if near_miss_list:
-            st.session_state.near_miss = (
-                "The following near misses were identified due to missing or improper use of PPE: " 
-                + ", ".join(near_miss_list) 
-                + ". These incidents highlight potential risks that could lead to injuries or accidents. "
-                "Corrective measures should be implemented immediately."
-            )
-        else:
-            st.session_state.near_miss = (
-                "No near misses related to PPE usage were identified during this observation. "
-                "This indicates a strong safety culture and adherence to PPE protocols."
-            )
-
     # Add this after the PPE table is displayed in the "Image", "Video", or "Webcam" sections
     if st.session_state.ppe_df is not None:
         generate_report_based_on_ppe_table(st.session_state.ppe_df, sections)
@@ -1203,7 +1100,7 @@ elif source == "Video":
         # Add a Generate Report button
         if st.button("Generate Safety Report"):
             # Generate the PDF
-            st.session_state.pdf_filename = generate_pdf_report(
+            st.session_state.pdf_bytes = generate_pdf_report(
                 date=st.session_state.date.strftime("%Y-%m-%d"),
                 time=st.session_state.time.strftime("%I:%M %p"),
                 location=st.session_state.location,
@@ -1215,49 +1112,57 @@ elif source == "Video":
                 supervisor_name=supervisor_name
             )
 
+            # Keep the observation after the tab is closed
+            save_current_observation(supervisor_name)
+
             # Set session state to indicate report has been generated
-            if st.session_state.pdf_filename:
+            if st.session_state.pdf_bytes:
                 st.session_state.report_generated = True
 
-        # Check if the report has been generated and the filename is valid
-        if st.session_state.report_generated and st.session_state.pdf_filename:
+        # Check if the report has been generated
+        if st.session_state.report_generated and st.session_state.pdf_bytes:
             st.success("Safety report generated and submitted successfully!")
             
             # Provide a download link for the PDF
-            try:
-                with open(st.session_state.pdf_filename, "rb") as f:
-                    st.download_button(
-                        label="Download Safety Observation Card (PDF)",
-                        data=f,
-                        file_name=os.path.basename(st.session_state.pdf_filename),  # Use the filename only
-                        mime="application/pdf",
-                    )
-            except FileNotFoundError:
-                st.error("The report file was not found. Please generate the report again.")
-            except Exception as e:
-                st.error(f"An error occurred while opening the report file: {e}")
+            st.download_button(
+                label="Download Safety Observation Card (PDF)",
+                data=st.session_state.pdf_bytes,
+                file_name="safety_observation_card.pdf",
+                mime="application/pdf",
+            )
 
             # Reset the session state (optional)
             st.session_state.report_generated = False
-            st.session_state.pdf_filename = None
+            st.session_state.pdf_bytes = None
 
 
     elif option == "Manual":
         uploaded_video = st.file_uploader("Upload a video", type=["mp4", "avi", "mov"])
         if uploaded_video is not None:
-            # Save the uploaded video to a temporary file
-            tfile = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-            tfile.write(uploaded_video.read())
-            st.video(tfile.name, format="video/mp4", start_time=0)
+            # Store the uploaded video on disk once (deduplicated by content and reused across reruns)
+            video_path = store_upload(uploaded_video)
+            st.video(video_path, format="video/mp4", start_time=0)
             
+        sampling_seed, keyframes_only = frame_sampling_options()
         if st.button("Take Batches from Video"):
-            frames = take_random_frames(tfile.name, num_frames=8)
+            frames = take_random_frames(video_path, num_frames=8, seed=sampling_seed, keyframes_only=keyframes_only)
 
             if frames:
                 st.session_state.frames = frames  # Store frames persistently
                 st.session_state.selected_frame = 0  # Default frame selection
+                st.session_state.frame_results = {}  # Detections are cached per frame index
 
         if "frames" in st.session_state and st.session_state.frames:
+            # Run detection on every sampled frame at once
+            if st.button("Detect All Frames"):
+                try:
+                    detect_video_frames(range(len(st.session_state.frames)))
+                except Exception as e:
+                    st.error(f"An error occurred during model inference or image processing: {e}")
+
+            # Per-frame PPE summary from the cached detections
+            show_frame_summary()
+
             st.write("Select a frame for detection:")
 
             # Use session state to remember the selected frame
@@ -1288,36 +1193,22 @@ elif source == "Video":
                 if st.button("Detect Objects"):
                     # Process the image with YOLOv8 model
                     try:
-                        results = model(image_np)
+                        # Reuse the cached detections if this frame was already processed
+                        frame_results = video_frame_results()
+                        if st.session_state.selected_frame not in frame_results:
+                            detect_video_frames([st.session_state.selected_frame])
                         st.write("Model inference successful!")
 
-                        detected_classes = []
-                        for result in results:
-                            for box in result.boxes:
-                                class_id = int(box.cls)
-                                class_name = model.names[class_id]
-                                detected_classes.append(class_name)
-
-                                x1, y1, x2, y2 = map(int, box.xyxy[0])
-                                color = class_colors.get(class_name, (0, 255, 0))
-                                cv2.rectangle(image_np, (x1, y1), (x2, y2), color, 2)
-                                cv2.putText(image_np, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                        image_np = frame_results[st.session_state.selected_frame]["image"].copy()
+                        detected_classes = frame_results[st.session_state.selected_frame]["classes"]
+                        remember_detection(image_np, detected_classes)
 
                         # Display the detected image in the same row
                         with col2:
                             st.image(image_np, caption="Detected Objects", width=400)
 
                         # Provide a download link for the image with bounding boxes
-                        pil_image = Image.fromarray(image_np)
-                        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                            pil_image.save(tmp_file.name)
-                            with open(tmp_file.name, "rb") as f:
-                                st.download_button(
-                                    label="Download Image with Bounding Boxes",
-                                    data=f,
-                                    file_name="detected_objects.png",
-                                    mime="image/png",
-                                )
+                        start_image_download(image_np)
 
                     except Exception as e:
                         st.error(f"An error occurred during model inference or image processing: {e}")
@@ -1461,7 +1352,7 @@ elif source == "Video":
                 st.session_state.near_miss = near_miss_text
 
                 # Generate the PDF
-                st.session_state.pdf_filename = generate_pdf_report(
+                st.session_state.pdf_bytes = generate_pdf_report(
                     date=st.session_state.date.strftime("%Y-%m-%d"),
                     time=st.session_state.time.strftime("%I:%M %p"),
                     location=st.session_state.location,
@@ -1473,31 +1364,28 @@ elif source == "Video":
                     supervisor_name=supervisor_name
                 )
 
+                # Keep the observation after the tab is closed
+                save_current_observation(supervisor_name)
+
                 # Set session state to indicate report has been generated
-                if st.session_state.pdf_filename:
+                if st.session_state.pdf_bytes:
                     st.session_state.report_generated = True
 
-            # Check if the report has been generated and the filename is valid
-            if st.session_state.report_generated and st.session_state.pdf_filename:
+            # Check if the report has been generated
+            if st.session_state.report_generated and st.session_state.pdf_bytes:
                 st.success("Safety report generated and submitted successfully!")
                 
                 # Provide a download link for the PDF
-                try:
-                    with open(st.session_state.pdf_filename, "rb") as f:
-                        st.download_button(
-                            label="Download Safety Observation Card (PDF)",
-                            data=f,
-                            file_name=os.path.basename(st.session_state.pdf_filename),  # Use the filename only
-                            mime="application/pdf",
-                        )
-                except FileNotFoundError:
-                    st.error("The report file was not found. Please generate the report again.")
-                except Exception as e:
-                    st.error(f"An error occurred while opening the report file: {e}")
+                st.download_button(
+                    label="Download Safety Observation Card (PDF)",
+                    data=st.session_state.pdf_bytes,
+                    file_name="safety_observation_card.pdf",
+                    mime="application/pdf",
+                )
 
                 # Reset the session state (optional)
                 st.session_state.report_generated = False
-                st.session_state.pdf_filename = None
+                st.session_state.pdf_bytes = None
 
 elif source == "Webcam":
     if option == "Automatic":
@@ -1526,14 +1414,20 @@ elif source == "Webcam":
             st.session_state.detect_objects_pressed = False
         if "report_generated" not in st.session_state:
             st.session_state.report_generated = False
-        if "pdf_filename" not in st.session_state:
-            st.session_state.pdf_filename = None
+        if "pdf_bytes" not in st.session_state:
+            st.session_state.pdf_bytes = None
+
+        detect_every, motion_gate, live_view = live_detection_options()
 
         # Start Webcam Button
         if not st.session_state.camera_running:
             if st.button("Start Webcam"):
                 st.session_state.camera_running = True
                 st.session_state.cap = cv2.VideoCapture(0)  # Open webcam
+                st.session_state.session_tracker = SessionTracker(model.names, detect_every=detect_every)
+                st.session_state.motion_gate = motion_gate
+                st.session_state.live_view = live_view
+                st.session_state.snapshot_detections = None
                 st.session_state.detected_classes = set()  # Reset detected classes
                 st.session_state.snapshot_taken = False  # Reset snapshot flag
                 st.session_state.snapshot = None  # Reset snapshot
@@ -1545,51 +1439,25 @@ elif source == "Webcam":
             # Add a "Stop Detection" button below the live feed
             if st.button("Stop Detection"):
                 st.session_state.camera_running = False
+                stop_live_pipeline()  # Stop the capture/inference threads before touching the camera
                 if st.session_state.cap is not None:
-                    ret, frame = st.session_state.cap.read()
-                    if ret:
-                        st.session_state.snapshot = frame.copy()  # Store snapshot before processing
+                    tracker = st.session_state.get("session_tracker")
+                    if tracker is not None and tracker.last_frame is not None:
+                        # Keep the last live frame and its boxes instead of detecting a new frame from scratch
+                        st.session_state.snapshot = cv2.cvtColor(tracker.last_frame, cv2.COLOR_RGB2BGR)
+                        st.session_state.snapshot_detections = tracker.last_detections
                         st.session_state.snapshot_taken = True
+                    else:
+                        ret, frame = st.session_state.cap.read()
+                        if ret:
+                            st.session_state.snapshot = frame.copy()  # Store snapshot before processing
+                            st.session_state.snapshot_taken = True
                     st.session_state.cap.release()  # Release the camera
                 cv2.destroyAllWindows()
 
-            while st.session_state.camera_running:
-                ret, frame = st.session_state.cap.read()
-                if not ret:
-                    st.error("Failed to capture frame")
-                    break
-
-                # Convert frame to RGB for Streamlit
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-                # Perform YOLO inference on live frame
-                results = model(frame_rgb)
-
-                # Reset detected classes for each frame
-                detected_classes = set()
-
-                for result in results:
-                    for box in result.boxes:
-                        class_id = int(box.cls)
-                        class_name = model.names[class_id]
-                        detected_classes.add(class_name)
-
-                        # Draw bounding boxes
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        color = class_colors.get(class_name, (0, 255, 0))  # Keep colors unchanged
-                        cv2.rectangle(frame_rgb, (x1, y1), (x2, y2), color, 2)
-                        cv2.putText(frame_rgb, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-
-                # Update session state and table
-                st.session_state.detected_classes = detected_classes
-                frame_placeholder.image(frame_rgb, channels="RGB", use_column_width=True)
-
-                # Stop condition
-                if not st.session_state.camera_running:
-                    if st.session_state.cap is not None:
-                        st.session_state.cap.release()
-                    cv2.destroyAllWindows()
-                    break
+            # Capture, inference and rendering run as separate pipeline stages
+            stats_placeholder = st.empty()  # Placeholder for per-stage timings
+            run_live_detection(frame_placeholder, stats_placeholder)
 
         # Process the snapshot after stopping detection
         if st.session_state.snapshot_taken and st.session_state.snapshot is not None:
@@ -1598,23 +1466,20 @@ elif source == "Webcam":
 
             # Process the snapshot with YOLOv8 model
             try:
-                results = model(st.session_state.snapshot)
+                # Boxes from the live session when available; otherwise cached by image content,
+                # model and parameters so reruns skip inference
+                detections = st.session_state.get("snapshot_detections")
+                if detections is None:
+                    detections = detect_cached(model, st.session_state.snapshot)
                 st.write("Model inference successful!")
 
-                detected_classes = []
-                for result in results:
-                    for box in result.boxes:
-                        class_id = int(box.cls)
-                        class_name = model.names[class_id]
-                        detected_classes.append(class_name)
-
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        color = class_colors.get(class_name, (0, 255, 0))  # Keep default colors
-                        cv2.rectangle(st.session_state.snapshot, (x1, y1), (x2, y2), color, 2)
-                        cv2.putText(st.session_state.snapshot, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                # Draw on a copy so the stored snapshot (and its cache key) stays unchanged
+                annotated_snapshot = st.session_state.snapshot.copy()
+                detected_classes = annotate(annotated_snapshot, detections, model.names)
 
                 # Convert the processed image back to RGB before displaying
-                processed_snapshot = cv2.cvtColor(st.session_state.snapshot, cv2.COLOR_BGR2RGB)
+                processed_snapshot = cv2.cvtColor(annotated_snapshot, cv2.COLOR_BGR2RGB)
+                remember_detection(processed_snapshot, detected_classes)
 
                 # Display the captured snapshot and detected image in the same row
                 col1, col2 = st.columns(2)
@@ -1660,45 +1525,12 @@ elif source == "Webcam":
                     unsafe_allow_html=True
                 )
 
-                # Update the PPE table based on detected objects
-                ppe_options = ["Head Protection", "Eyes Protection", "Face Protection", "Hand Protection", "Foot Protection", "Body Protection"]
-                ppe_items = ["Hairnet", "Goggles", "Mask", "Gloves", "Shoes", "Full-body suit"]
-
-                table_data = {
-                    "Checklist": ppe_options,
-                    "PPE": ppe_items,  # Add the new PPE column
-                    "N/A": ["☐"] * len(ppe_options),
-                    "Safe": ["☐"] * len(ppe_options),
-                    "Unsafe": ["☐"] * len(ppe_options),
-                }
-
-                for i, ppe in enumerate(ppe_options):
-                    section_name = ppe.split(" ")[0]
-                    if section_name in sections:
-                        if section_name == "Head" and "hairnet" in detected_classes:
-                            table_data["Safe"][i] = "☑"
-                        elif section_name == "Face" and "mask" in detected_classes:
-                            table_data["Safe"][i] = "☑"
-                        elif section_name == "Eyes" and "goggles" in detected_classes:
-                            table_data["Safe"][i] = "☑"
-                        elif section_name == "Hand" and "gloves" in detected_classes:
-                            table_data["Safe"][i] = "☑"
-                        elif section_name == "Body" and "full-body suit" in detected_classes:
-                            table_data["Safe"][i] = "☑"
-                        elif section_name == "Foot" and "shoes" in detected_classes:
-                            table_data["Safe"][i] = "☑"
-                        else:
-                            table_data["Unsafe"][i] = "☑"
-                    else:
-                        table_data["N/A"][i] = "☑"
-
-                # Convert the table data into a DataFrame for better display
-                st.session_state.ppe_df = pd.DataFrame(table_data)
-
-                # Add this code here
-                st.session_state.ppe_df = st.session_state.ppe_df.reset_index(drop=True)
-                st.session_state.ppe_df.index += 1
-                st.session_state.ppe_df.index.name = "No."
+                # Update the PPE table based on the whole live session, or on the snapshot alone
+                tracker = st.session_state.get("session_tracker")
+                if tracker is not None and tracker.rounds:
+                    st.session_state.ppe_df = ppe_table(tracker.session_statuses(sections))
+                else:
+                    st.session_state.ppe_df = build_ppe_table_from_ids(detections.cls, model.names, sections)
 
                 # Apply custom CSS styles for better formatting
                 st.markdown( """
@@ -1725,6 +1557,10 @@ elif source == "Webcam":
 
                 # Display the table
                 st.table(st.session_state.ppe_df)
+                if tracker is not None and tracker.rounds:
+                    show_session_workers(tracker)
+                if per_person:
+                    show_person_compliance(original_snapshot, detections)
 
                 # Generate report based on PPE table
                 generate_report_based_on_ppe_table(st.session_state.ppe_df, sections)
@@ -1749,7 +1585,7 @@ elif source == "Webcam":
                 # Add a Generate Report button
                 if st.button("Generate Safety Report"):
                     # Generate the PDF
-                    st.session_state.pdf_filename = generate_pdf_report(
+                    st.session_state.pdf_bytes = generate_pdf_report(
                         date=st.session_state.date.strftime("%Y-%m-%d"),
                         time=st.session_state.time.strftime("%I:%M %p"),
                         location=st.session_state.location,
@@ -1761,31 +1597,28 @@ elif source == "Webcam":
                         supervisor_name=supervisor_name
                     )
 
+                    # Keep the observation after the tab is closed
+                    save_current_observation(supervisor_name)
+
                     # Set session state to indicate report has been generated
-                    if st.session_state.pdf_filename:
+                    if st.session_state.pdf_bytes:
                         st.session_state.report_generated = True
 
-                # Check if the report has been generated and the filename is valid
-                if st.session_state.report_generated and st.session_state.pdf_filename:
+                # Check if the report has been generated
+                if st.session_state.report_generated and st.session_state.pdf_bytes:
                     st.success("Safety report generated and submitted successfully!")
 
                     # Provide a download link for the PDF
-                    try:
-                        with open(st.session_state.pdf_filename, "rb") as f:
-                            st.download_button(
-                                label="Download Safety Observation Card (PDF)",
-                                data=f,
-                                file_name=os.path.basename(st.session_state.pdf_filename),  # Use the filename only
-                                mime="application/pdf",
-                            )
-                    except FileNotFoundError:
-                        st.error("The report file was not found. Please generate the report again.")
-                    except Exception as e:
-                        st.error(f"An error occurred while opening the report file: {e}")
+                    st.download_button(
+                        label="Download Safety Observation Card (PDF)",
+                        data=st.session_state.pdf_bytes,
+                        file_name="safety_observation_card.pdf",
+                        mime="application/pdf",
+                    )
 
                     # Reset the session state (optional)
                     st.session_state.report_generated = False
-                    st.session_state.pdf_filename = None
+                    st.session_state.pdf_bytes = None
 
             except Exception as e:
                 st.error(f"An error occurred during model inference or image processing: {e}")
@@ -1803,11 +1636,17 @@ elif source == "Webcam":
         if "snapshot" not in st.session_state:
             st.session_state.snapshot = None
 
+        detect_every, motion_gate, live_view = live_detection_options()
+
         # Start Webcam Button
         if not st.session_state.camera_running:
             if st.button("Start Webcam"):
                 st.session_state.camera_running = True
                 st.session_state.cap = cv2.VideoCapture(0)  # Open webcam
+                st.session_state.session_tracker = SessionTracker(model.names, detect_every=detect_every)
+                st.session_state.motion_gate = motion_gate
+                st.session_state.live_view = live_view
+                st.session_state.snapshot_detections = None
                 st.session_state.detected_classes = set()  # Reset detected classes
                 st.session_state.snapshot_taken = False  # Reset snapshot flag
                 st.session_state.snapshot = None  # Reset snapshot
@@ -1819,51 +1658,25 @@ elif source == "Webcam":
             # Add a "Stop Detection" button below the live feed
             if st.button("Stop Detection"):
                 st.session_state.camera_running = False
+                stop_live_pipeline()  # Stop the capture/inference threads before touching the camera
                 if st.session_state.cap is not None:
-                    ret, frame = st.session_state.cap.read()
-                    if ret:
-                        st.session_state.snapshot = frame.copy()  # Store snapshot before processing
+                    tracker = st.session_state.get("session_tracker")
+                    if tracker is not None and tracker.last_frame is not None:
+                        # Keep the last live frame and its boxes instead of detecting a new frame from scratch
+                        st.session_state.snapshot = cv2.cvtColor(tracker.last_frame, cv2.COLOR_RGB2BGR)
+                        st.session_state.snapshot_detections = tracker.last_detections
                         st.session_state.snapshot_taken = True
+                    else:
+                        ret, frame = st.session_state.cap.read()
+                        if ret:
+                            st.session_state.snapshot = frame.copy()  # Store snapshot before processing
+                            st.session_state.snapshot_taken = True
                     st.session_state.cap.release()  # Release the camera
                 cv2.destroyAllWindows()
 
-            while st.session_state.camera_running:
-                ret, frame = st.session_state.cap.read()
-                if not ret:
-                    st.error("Failed to capture frame")
-                    break
-
-                # Convert frame to RGB for Streamlit
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-                # Perform YOLO inference on live frame
-                results = model(frame_rgb)
-
-                # Reset detected classes for each frame
-                detected_classes = set()
-
-                for result in results:
-                    for box in result.boxes:
-                        class_id = int(box.cls)
-                        class_name = model.names[class_id]
-                        detected_classes.add(class_name)
-
-                        # Draw bounding boxes
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        color = class_colors.get(class_name, (0, 255, 0))  # Keep colors unchanged
-                        cv2.rectangle(frame_rgb, (x1, y1), (x2, y2), color, 2)
-                        cv2.putText(frame_rgb, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
-
-                # Update session state and table
-                st.session_state.detected_classes = detected_classes
-                frame_placeholder.image(frame_rgb, channels="RGB", use_column_width=True)
-
-                # Stop condition
-                if not st.session_state.camera_running:
-                    if st.session_state.cap is not None:
-                        st.session_state.cap.release()
-                    cv2.destroyAllWindows()
-                    break
+            # Capture, inference and rendering run as separate pipeline stages
+            stats_placeholder = st.empty()  # Placeholder for per-stage timings
+            run_live_detection(frame_placeholder, stats_placeholder)
 
         # Process the snapshot after stopping detection
         if st.session_state.snapshot_taken and st.session_state.snapshot is not None:
@@ -1872,23 +1685,20 @@ elif source == "Webcam":
 
             # Process the snapshot with YOLOv8 model
             try:
-                results = model(st.session_state.snapshot)
+                # Boxes from the live session when available; otherwise cached by image content,
+                # model and parameters so reruns skip inference
+                detections = st.session_state.get("snapshot_detections")
+                if detections is None:
+                    detections = detect_cached(model, st.session_state.snapshot)
                 st.write("Model inference successful!")
 
-                detected_classes = []
-                for result in results:
-                    for box in result.boxes:
-                        class_id = int(box.cls)
-                        class_name = model.names[class_id]
-                        detected_classes.append(class_name)
-
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        color = class_colors.get(class_name, (0, 255, 0))  # Keep default colors
-                        cv2.rectangle(st.session_state.snapshot, (x1, y1), (x2, y2), color, 2)
-                        cv2.putText(st.session_state.snapshot, class_name, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+                # Draw on a copy so the stored snapshot (and its cache key) stays unchanged
+                annotated_snapshot = st.session_state.snapshot.copy()
+                detected_classes = annotate(annotated_snapshot, detections, model.names)
 
                 # Convert the processed image back to RGB before displaying
-                processed_snapshot = cv2.cvtColor(st.session_state.snapshot, cv2.COLOR_BGR2RGB)
+                processed_snapshot = cv2.cvtColor(annotated_snapshot, cv2.COLOR_BGR2RGB)
+                remember_detection(processed_snapshot, detected_classes)
 
                 # Display the captured snapshot and detected image in the same row
                 col1, col2 = st.columns(2)
@@ -2037,7 +1847,7 @@ elif source == "Webcam":
                     st.session_state.near_miss = near_miss_text
 
                     # Generate the PDF
-                    st.session_state.pdf_filename = generate_pdf_report(
+                    st.session_state.pdf_bytes = generate_pdf_report(
                         date=st.session_state.date.strftime("%Y-%m-%d"),
                         time=st.session_state.time.strftime("%I:%M %p"),
                         location=st.session_state.location,
@@ -2049,30 +1859,54 @@ elif source == "Webcam":
                         supervisor_name=supervisor_name
                     )
 
+                    # Keep the observation after the tab is closed
+                    save_current_observation(supervisor_name)
+
                     # Set session state to indicate report has been generated
-                    if st.session_state.pdf_filename:
+                    if st.session_state.pdf_bytes:
                         st.session_state.report_generated = True
 
-                    # Check if the report has been generated and the filename is valid
-                    if st.session_state.report_generated and st.session_state.pdf_filename:
+                    # Check if the report has been generated
+                    if st.session_state.report_generated and st.session_state.pdf_bytes:
                         st.success("Safety report generated and submitted successfully!")
 
                         # Provide a download link for the PDF
-                        try:
-                            with open(st.session_state.pdf_filename, "rb") as f:
-                                st.download_button(
-                                    label="Download Safety Observation Card (PDF)",
-                                    data=f,
-                                    file_name=os.path.basename(st.session_state.pdf_filename),  # Use the filename only
-                                    mime="application/pdf",
-                                )
-                        except FileNotFoundError:
-                            st.error("The report file was not found. Please generate the report again.")
-                        except Exception as e:
-                            st.error(f"An error occurred while opening the report file: {e}")
+                        st.download_button(
+                            label="Download Safety Observation Card (PDF)",
+                            data=st.session_state.pdf_bytes,
+                            file_name="safety_observation_card.pdf",
+                            mime="application/pdf",
+                        )
 
                         # Reset the session state (optional)
                         st.session_state.report_generated = False
-                        st.session_state.pdf_filename = None
+                        st.session_state.pdf_bytes = None
             except Exception as e:
                 st.error(f"An error occurred during model inference or image processing: {e}")
+
+elif source == "Multi-camera":
+    # Several cameras, streams or video files monitored at once with one shared, batched model
+    sources_text = st.text_area("Sources (one per line: camera index, RTSP URL or video file)", value="0\n1")
+    grid_columns = st.slider("Grid columns", min_value=1, max_value=4, value=2)
+    max_batch_size = st.slider("Frames per model call", min_value=1, max_value=8, value=4)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        start_cameras = st.button("Start Cameras")
+    with col2:
+        stop_cameras = st.button("Stop Cameras")
+
+    if start_cameras or stop_cameras:
+        stop_multi_camera()
+    if start_cameras:
+        sources = parse_sources(sources_text)
+        if sources:
+            st.session_state.multi_camera = MultiCameraMonitor(sources, model, max_batch_size=max_batch_size).start()
+        else:
+            st.warning("Enter at least one source.")
+
+    if st.session_state.get("multi_camera") is not None:
+        run_multi_camera(st.session_state.multi_camera, grid_columns)
+
+show_observation_history()
+finish_image_downloads()
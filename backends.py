@@ -0,0 +1,232 @@
+"""CPU inference backends for the YOLO weights.
+
+The PyTorch weights are exported once to ONNX (ONNX Runtime) or OpenVINO and the
+exported model is stored next to the .pt file; it is re-exported only when the
+.pt changes. Reduced-precision variants trade a little accuracy for speed:
+"onnx-int8" (dynamic INT8 quantization of the ONNX export, no calibration data
+needed) and "openvino-fp16" (FP16 OpenVINO weights). Exported models are
+loaded through ultralytics as well, so they return the same results the drawing
+and checklist code already uses.
+
+Pick the backend per deployment with BANTAI_BACKEND=onnx (or openvino), and
+check that an exported model agrees with PyTorch before switching:
+
+    python backends.py export "my_model.pt" --backend onnx
+    python backends.py parity "my_model.pt" --backend onnx --images /data/site-photos
+
+benchmark_models.py measures what each variant gains in speed and loses in
+agreement with the FP32 PyTorch weights.
+"""
+import argparse
+import importlib.util
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+from ultralytics import YOLO
+
+from detection import detections_from_result
+
+BACKENDS = ("pytorch", "onnx", "openvino", "onnx-int8", "openvino-fp16")
+DEFAULT_BACKEND = os.environ.get("BANTAI_BACKEND", "pytorch")
+EXPORT_IMAGE_SIZE = 640
+
+# Python packages each backend needs for exporting and running the model
+BACKEND_PACKAGES = {
+    "pytorch": (),
+    "onnx": ("onnx", "onnxruntime"),
+    "openvino": ("openvino",),
+    "onnx-int8": ("onnx", "onnxruntime"),
+    "openvino-fp16": ("openvino",),
+}
+
+_export_locks = {}
+_export_locks_lock = threading.Lock()
+# Exports started from the app run here, one at a time, instead of on the script thread
+_export_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="bantai-export")
+_pending_exports = {}
+
+
+def check_backend(backend):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; choose one of {', '.join(BACKENDS)}")
+    return backend
+
+
+def available_backends():
+    # Backends whose runtime packages are installed
+    return [b for b in BACKENDS if all(importlib.util.find_spec(p) is not None for p in BACKEND_PACKAGES[b])]
+
+
+def exported_path(weights_path, backend):
+    # my_model.onnx, my_model_openvino_model/, my_model.int8.onnx, my_model_fp16_openvino_model/
+    stem = os.path.splitext(weights_path)[0]
+    return {
+        "onnx": stem + ".onnx",
+        "openvino": stem + "_openvino_model",
+        "onnx-int8": stem + ".int8.onnx",
+        "openvino-fp16": stem + "_fp16_openvino_model",
+    }[backend]
+
+
+def quantize_onnx_int8(source, target):
+    # Dynamic quantization: INT8 weights, activations quantized on the fly
+    import onnx
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(source, target, weight_type=QuantType.QUInt8)
+    # Keep the class names and input size ultralytics stored in the original export
+    original, quantized = onnx.load(source), onnx.load(target)
+    del quantized.metadata_props[:]
+    quantized.metadata_props.extend(original.metadata_props)
+    onnx.save(quantized, target)
+
+
+def move_into_place(staged, target):
+    # Replace `target` with a finished export. Files are swapped atomically; an old export
+    # folder is moved aside first. If another process got there first, its export is kept.
+    old = None
+    if os.path.isdir(target):
+        old = tempfile.mkdtemp(dir=os.path.dirname(target), prefix=".export-old-")
+        os.replace(target, os.path.join(old, "export"))
+    try:
+        os.replace(staged, target)
+    except OSError:
+        if not os.path.exists(target):
+            raise
+    finally:
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+def export_weights(weights_path, backend, imgsz=EXPORT_IMAGE_SIZE):
+    # Exported model for `backend`, exporting only when it is missing or older than the .pt.
+    # The export is written to a staging folder next to the weights and moved into place when
+    # complete, so no process ever loads a half-written model. The lock only covers threads;
+    # callers that start several processes (batch_audit --workers) export once beforehand.
+    target = exported_path(weights_path, backend)
+    with _export_locks_lock:
+        lock = _export_locks.setdefault(target, threading.Lock())
+    with lock:
+        if export_ready(weights_path, backend):
+            return target
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(target), prefix=".export-") as staging:
+            if backend == "onnx-int8":
+                staged = os.path.join(staging, "model.int8.onnx")
+                quantize_onnx_int8(export_weights(weights_path, "onnx", imgsz), staged)
+            else:
+                # Exported from a copy of the .pt, so ultralytics writes into the staging folder
+                # (and the FP32 and FP16 OpenVINO exports do not share a folder name)
+                copy = os.path.join(staging, "model.pt")
+                shutil.copy2(weights_path, copy)
+                export_format = "openvino" if backend == "openvino-fp16" else backend
+                # Dynamic shapes so batched calls (video frames, micro-batching) work as with PyTorch
+                YOLO(copy).export(format=export_format, imgsz=imgsz, dynamic=True, half=backend == "openvino-fp16")
+                staged = os.path.join(staging, "model.onnx" if backend == "onnx" else "model_openvino_model")
+            if not os.path.exists(staged):
+                raise RuntimeError(f"Export to {backend} did not produce {target}")
+            move_into_place(staged, target)
+        return target
+
+
+def export_ready(weights_path, backend):
+    if backend == "pytorch":
+        return True
+    target = exported_path(weights_path, backend)
+    return os.path.exists(target) and os.path.getmtime(target) >= os.path.getmtime(weights_path)
+
+
+def start_export(weights_path, backend):
+    # Future of a background export, for callers that must not wait for it. A failed
+    # export is kept (and reported) rather than retried on every call.
+    with _export_locks_lock:
+        future = _pending_exports.get((weights_path, backend))
+        if future is None or (future.done() and future.exception() is None and not export_ready(weights_path, backend)):
+            future = _export_executor.submit(export_weights, weights_path, backend)
+            _pending_exports[(weights_path, backend)] = future
+        return future
+
+
+def load_yolo(weights_path, backend=DEFAULT_BACKEND):
+    if check_backend(backend) == "pytorch":
+        return YOLO(weights_path)
+    return YOLO(export_weights(weights_path, backend), task="detect")
+
+
+def load_images(folder, limit=None):
+    names = sorted(n for n in os.listdir(folder) if n.lower().endswith((".jpg", ".jpeg", ".png")))[:limit]
+    return names, [np.array(Image.open(os.path.join(folder, n)).convert("RGB")) for n in names]
+
+
+def compare_detections(reference, candidate, min_iou=0.5):
+    # Boxes of the same class matched one to one by overlap; returns match counts and quality
+    from tracking import iou_matrix, match_boxes  # Imported here: tracking imports model_registry, which imports this module
+
+    matched, ious, conf_diffs, per_class = 0, [], [], {}
+    for class_id in np.union1d(reference.cls, candidate.cls).tolist():
+        a, b = reference.cls == class_id, candidate.cls == class_id
+        pairs = match_boxes(reference.xyxy[a], candidate.xyxy[b], min_iou)
+        if pairs:
+            i, j = np.array(pairs).T
+            ious.extend(iou_matrix(reference.xyxy[a][i], candidate.xyxy[b][j]).diagonal().tolist())
+            conf_diffs.extend(np.abs(reference.conf[a][i] - candidate.conf[b][j]).tolist())
+        matched += len(pairs)
+        per_class[class_id] = (int(a.sum()), int(b.sum()), len(pairs))
+    return {
+        "per_class": per_class,
+        "reference": len(reference.cls),
+        "candidate": len(candidate.cls),
+        "matched": matched,
+        "mean_iou": float(np.mean(ious)) if ious else 1.0,
+        "max_conf_diff": float(np.max(conf_diffs)) if conf_diffs else 0.0,
+    }
+
+
+def parity_check(weights_path, backend, images, min_iou=0.5):
+    # Run PyTorch and `backend` on the same images and compare their detections per image
+    reference_model, candidate_model = load_yolo(weights_path, "pytorch"), load_yolo(weights_path, backend)
+    reports = []
+    for image in images:
+        reference = detections_from_result(reference_model(image, verbose=False)[0])
+        candidate = detections_from_result(candidate_model(image, verbose=False)[0])
+        reports.append(compare_detections(reference, candidate, min_iou))
+    return reports
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export YOLO weights to a CPU runtime and check parity with PyTorch.")
+    parser.add_argument("command", choices=["export", "parity"])
+    parser.add_argument("weights", help="PyTorch weights (.pt)")
+    parser.add_argument("--backend", choices=BACKENDS[1:], default="onnx")
+    parser.add_argument("--images", help="Folder of test images (parity)")
+    parser.add_argument("--limit", type=int, default=50, help="Maximum number of test images")
+    parser.add_argument("--min-iou", type=float, default=0.9, help="Overlap a box needs to count as the same detection")
+    args = parser.parse_args(argv)
+
+    weights = os.path.abspath(args.weights)
+    if args.command == "export":
+        print(export_weights(weights, args.backend))
+        return 0
+
+    if not args.images:
+        parser.error("parity needs --images")
+    names, images = load_images(args.images, args.limit)
+    reports = parity_check(weights, args.backend, images, args.min_iou)
+    failed = 0
+    for name, report in zip(names, reports):
+        ok = report["matched"] == report["reference"] == report["candidate"]
+        failed += not ok
+        print(f"{'OK  ' if ok else 'DIFF'} {name}: {report['matched']}/{report['reference']} boxes matched "
+              f"({report['candidate']} from {args.backend}), mean IoU {report['mean_iou']:.3f}, "
+              f"max confidence difference {report['max_conf_diff']:.3f}")
+    print(f"{len(reports) - failed}/{len(reports)} images agree")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+"""Headless PPE audit of a folder of site photos and videos.
+
+Example:
+    python batch_audit.py /data/site-photos --output audit.csv --pdf-dir reports --workers 2
+
+Results are appended to a checkpoint file while the run progresses, so an
+interrupted backfill can be restarted with the same command and only the
+remaining files are processed. Files that cannot be read are listed in
+<output>.errors.csv and skipped on later runs.
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from itertools import groupby, islice
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+from detection import PROFILE, build_ppe_table, checklist_status, detect_batch, detections_from_result
+from backends import BACKENDS, DEFAULT_BACKEND, check_backend, export_weights
+from model_registry import DEFAULT_WEIGHTS, get_model, resolve_weights
+from reporting import build_narratives, build_narratives_batch, generate_bulk_report, generate_pdf_report
+from video_io import classes_present, scan_video
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov")
+ALL_SECTIONS = PROFILE.section_names
+
+ROW_COLUMNS = ["File", "Type", "Detected", "No.", "Checklist", "PPE", "Status"]
+ERROR_COLUMNS = ["File", "Error"]
+
+
+def find_media(folder):
+    # Relative paths of all images and videos below `folder`, in a stable order
+    found = []
+    for root, _, names in os.walk(folder):
+        for name in names:
+            if name.lower().endswith(IMAGE_EXTENSIONS + VIDEO_EXTENSIONS):
+                found.append(os.path.relpath(os.path.join(root, name), folder))
+    return sorted(found)
+
+
+def load_image(folder, path):
+    return np.array(Image.open(os.path.join(folder, path)).convert("RGB"))
+
+
+def detect_files(folder, paths, weights, batch_size, video_stride, min_presence, backend=None):
+    # Detected class names per file, and an error message per file that could not be audited.
+    # Runs in a worker process, which loads its own model once.
+    model = get_model(weights, backend)
+    detected, errors = {}, {}
+
+    images = [p for p in paths if p.lower().endswith(IMAGE_EXTENSIONS)]
+    for start in range(0, len(images), batch_size):
+        chunk, arrays = [], []
+        for path in images[start:start + batch_size]:
+            try:
+                arrays.append(load_image(folder, path))
+                chunk.append(path)
+            except Exception as exc:  # Unreadable or truncated image: record it and keep going
+                errors[path] = f"{type(exc).__name__}: {exc}"
+        for path, result in zip(chunk, detect_batch(model, arrays, batch_size=batch_size)):
+            detections = detections_from_result(result)
+            detected[path] = sorted({model.names[int(class_id)] for class_id in detections.cls})
+
+    # Videos are judged from the whole clip, like "Scan whole video" in the app
+    for path in paths:
+        if path.lower().endswith(VIDEO_EXTENSIONS):
+            try:
+                scan = scan_video(model, os.path.join(folder, path), stride=video_stride, batch_size=batch_size)
+            except Exception as exc:
+                errors[path] = f"{type(exc).__name__}: {exc}"
+                continue
+            if scan["frames_scanned"] == 0:
+                errors[path] = "No frames could be decoded"
+                continue
+            detected[path] = sorted(classes_present(scan, min_fraction=min_presence))
+
+    return detected, errors
+
+
+def checklist_rows(path, detected_classes, ppe_df):
+    file_type = "video" if path.lower().endswith(VIDEO_EXTENSIONS) else "image"
+    detected = ";".join(detected_classes)
+    return [
+        {"File": path, "Type": file_type, "Detected": detected, "No.": number,
+         "Checklist": checklist, "PPE": ppe, "Status": status}
+        for number, checklist, ppe, status in zip(ppe_df.index, ppe_df["Checklist"], ppe_df["PPE"], checklist_status(ppe_df))
+    ]
+
+
+def observation_record(folder, path, ppe_df, narratives, location, supervisor_name):
+    # Date and time of the observation come from the file's modification time
+    taken = datetime.fromtimestamp(os.path.getmtime(os.path.join(folder, path)))
+    return dict(
+        date=taken.strftime("%Y-%m-%d"),
+        time=taken.strftime("%I:%M %p"),
+        location=location,
+        ppe_df=ppe_df,
+        supervisor_name=supervisor_name,
+        **narratives,
+    )
+
+
+def write_pdf(folder, path, ppe_df, sections, pdf_dir, location, supervisor_name):
+    narratives = build_narratives(ppe_df, sections)
+    pdf_bytes = generate_pdf_report(**observation_record(folder, path, ppe_df, narratives, location, supervisor_name))
+    target = os.path.join(pdf_dir, os.path.splitext(path)[0].replace(os.sep, "__") + ".pdf")
+    with open(target, "wb") as f:
+        f.write(pdf_bytes)
+
+
+def table_from_rows(rows):
+    # Rebuild a file's PPE checklist from its checkpoint rows
+    statuses = [row["Status"] for row in rows]
+    ppe_df = pd.DataFrame({
+        "Checklist": [row["Checklist"] for row in rows],
+        "PPE": [row["PPE"] for row in rows],
+        "N/A": ["☑" if status == "N/A" else "☐" for status in statuses],
+        "Safe": ["☑" if status == "Safe" else "☐" for status in statuses],
+        "Unsafe": ["☑" if status == "Unsafe" else "☐" for status in statuses],
+    }, index=[int(row["No."]) for row in rows])
+    ppe_df.index.name = "No."
+    return ppe_df
+
+
+def checkpoint_observations(checkpoint, folder, sections, location, supervisor_name, chunk_size=256):
+    # Stream one observation per audited file from the checkpoint (a file's rows are written together).
+    # Narratives are built for a chunk of files at a time rather than file by file.
+    def observations():
+        with open(checkpoint, newline="", encoding="utf-8") as f:
+            grouped = groupby(csv.DictReader(f), key=lambda row: row["File"])
+            while True:
+                chunk = [(path, table_from_rows(list(rows))) for path, rows in islice(grouped, chunk_size)]
+                if not chunk:
+                    break
+                narratives = build_narratives_batch([ppe_df for _, ppe_df in chunk], sections)
+                for (path, ppe_df), texts in zip(chunk, narratives):
+                    yield observation_record(folder, path, ppe_df, texts, location, supervisor_name)
+    return observations
+
+
+def read_checkpoint(checkpoint):
+    # Files listed in the checkpoint (or in the errors file) are not processed again
+    if not os.path.exists(checkpoint):
+        return set()
+    with open(checkpoint, newline="", encoding="utf-8") as f:
+        return {row["File"] for row in csv.DictReader(f)}
+
+
+def write_output(checkpoint, output, output_format):
+    # "N/A" is a checklist status, not a missing value
+    rows = pd.read_csv(checkpoint, keep_default_na=False)
+    if output_format == "parquet":
+        rows.to_parquet(output, index=False)
+    elif os.path.abspath(output) != os.path.abspath(checkpoint):
+        rows.to_csv(output, index=False)
+    return len(rows)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Audit a folder of images and videos for PPE compliance.")
+    parser.add_argument("input_dir", help="Folder with site photos and/or videos (searched recursively)")
+    parser.add_argument("--output", default="ppe_audit.csv", help="Checklist rows, one per file and checklist item")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None, help="Defaults to the output file extension")
+    parser.add_argument("--pdf-dir", default=None, help="Also write one Safety Observation Card PDF per file here")
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS, help="Model weights file")
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="Inference backend (default: BANTAI_BACKEND or pytorch)")
+    parser.add_argument("--sections", nargs="+", default=["All"], choices=ALL_SECTIONS + ["All"])
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per model call")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes, each with its own model copy")
+    parser.add_argument("--chunk-size", type=int, default=32, help="Files per work unit and checkpoint step")
+    parser.add_argument("--video-stride", type=int, default=10, help="Analyse every Nth video frame")
+    parser.add_argument("--min-presence", type=float, default=0.8, help="Fraction of video frames a PPE item must be seen in")
+    parser.add_argument("--bulk-pdf", default=None, help="Also compile all audited files into this single PDF pack")
+    parser.add_argument("--location", default="Site A")
+    parser.add_argument("--supervisor", default="M Muddassir Saleem")
+    parser.add_argument("--checkpoint", default=None, help="Progress file (default: <output>.partial.csv)")
+    parser.add_argument("--errors", default=None, help="Files that could not be audited (default: <output>.errors.csv)")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint and start over")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sections = ALL_SECTIONS if "All" in args.sections else args.sections
+    output_format = args.format or ("parquet" if args.output.lower().endswith(".parquet") else "csv")
+    checkpoint = args.checkpoint or args.output + ".partial.csv"
+    errors_file = args.errors or args.output + ".errors.csv"
+    weights = os.path.abspath(args.weights) if os.path.exists(args.weights) else args.weights
+
+    if args.restart:
+        for path in (checkpoint, errors_file):
+            if os.path.exists(path):
+                os.remove(path)
+    if args.pdf_dir:
+        os.makedirs(args.pdf_dir, exist_ok=True)
+
+    files = find_media(args.input_dir)
+    done = read_checkpoint(checkpoint)
+    failed = read_checkpoint(errors_file)
+    todo = [p for p in files if p not in done and p not in failed]
+    print(f"{len(files)} files found, {len(done)} already audited, {len(failed)} failed before, {len(todo)} to go.")
+
+    chunks = [todo[i:i + args.chunk_size] for i in range(0, len(todo), args.chunk_size)]
+    backend = check_backend(args.backend or DEFAULT_BACKEND)
+    if todo and backend != "pytorch":
+        # Export once here; worker processes would otherwise all export the same file at the same time
+        export_weights(resolve_weights(weights), backend)
+    job_args = (args.batch_size, args.video_stride, args.min_presence, backend)
+
+    new_file = not os.path.exists(checkpoint)
+    new_errors_file = not os.path.exists(errors_file)
+    with open(checkpoint, "a", newline="", encoding="utf-8") as f, \
+            open(errors_file, "a", newline="", encoding="utf-8") as errors_f:
+        writer = csv.DictWriter(f, fieldnames=ROW_COLUMNS)
+        error_writer = csv.DictWriter(errors_f, fieldnames=ERROR_COLUMNS)
+        if new_file:
+            writer.writeheader()
+        if new_errors_file:
+            error_writer.writeheader()
+
+        def record(detected, errors):
+            # A file counts as done only once its rows (and PDF) are written
+            for path in sorted(detected):
+                ppe_df = build_ppe_table(detected[path], sections)
+                if args.pdf_dir:
+                    write_pdf(args.input_dir, path, ppe_df, sections, args.pdf_dir, args.location, args.supervisor)
+                writer.writerows(checklist_rows(path, detected[path], ppe_df))
+            for path in sorted(errors):
+                print(f"Skipped {path}: {errors[path]}")
+                error_writer.writerow({"File": path, "Error": errors[path]})
+            f.flush()
+            errors_f.flush()
+            return len(detected) + len(errors)
+
+        audited = 0
+        if args.workers > 1:
+            with ProcessPoolExecutor(max_workers=args.workers) as executor:
+                futures = [executor.submit(detect_files, args.input_dir, chunk, weights, *job_args) for chunk in chunks]
+                for future in as_completed(futures):
+                    audited += record(*future.result())
+                    print(f"Audited {audited}/{len(todo)} files")
+        else:
+            for chunk in chunks:
+                audited += record(*detect_files(args.input_dir, chunk, weights, *job_args))
+                print(f"Audited {audited}/{len(todo)} files")
+
+    count = write_output(checkpoint, args.output, output_format)
+    print(f"Wrote {count} checklist rows to {args.output}")
+    failed = read_checkpoint(errors_file)
+    if failed:
+        print(f"{len(failed)} files could not be audited, see {errors_file}")
+
+    if args.bulk_pdf:
+        sites = generate_bulk_report(
+            checkpoint_observations(checkpoint, args.input_dir, sections, args.location, args.supervisor),
+            args.bulk_pdf,
+        )
+        for location, stats in sites.items():
+            print(f"{location}: {stats['observations']} observations, {stats['compliance']} compliance")
+        print(f"Wrote observation pack to {args.bulk_pdf}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Speed and accuracy of the reduced-precision model variants.
+
+Example:
+    python benchmark_models.py /data/site-photos --backends pytorch onnx-int8 openvino-fp16 --output benchmark.csv
+
+Every weights file is run on each backend over the same images. Latency is
+measured one image per call (like the webcam view), throughput with batched
+calls (like video scans and batch audits). Agreement compares each variant's
+boxes with the FP32 PyTorch model per class: matched boxes over the mean of the
+two box counts, so 1.0 means the variant found exactly the same objects.
+"""
+import argparse
+import sys
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+
+from backends import BACKENDS, compare_detections, load_images, load_yolo
+from detection import detect_batch, detections_from_result
+from model_registry import available_weights, resolve_weights
+
+
+def time_latency(model, images, warmup=3):
+    # Milliseconds per single-image call, after a few warm-up calls
+    for image in images[:warmup]:
+        model(image, verbose=False)
+    timings, results = [], []
+    for image in images:
+        start = perf_counter()
+        results.append(model(image, verbose=False)[0])
+        timings.append((perf_counter() - start) * 1000)
+    return np.array(timings), results
+
+
+def time_throughput(model, images, batch_size):
+    # Images per second with batched calls
+    start = perf_counter()
+    detect_batch(model, images, batch_size=batch_size)
+    return len(images) / (perf_counter() - start)
+
+
+def agreement_rows(model, reference, candidate, min_iou):
+    # Per-class box counts summed over all images; agreement = matched / mean(reference, candidate)
+    counts = {}
+    for ref, cand in zip(reference, candidate):
+        for class_id, (n_ref, n_cand, matched) in compare_detections(ref, cand, min_iou)["per_class"].items():
+            totals = counts.setdefault(model.names[int(class_id)], [0, 0, 0])
+            totals[0] += n_ref
+            totals[1] += n_cand
+            totals[2] += matched
+    return {
+        name: 2 * matched / (n_ref + n_cand) if n_ref + n_cand else 1.0
+        for name, (n_ref, n_cand, matched) in counts.items()
+    }
+
+
+def benchmark(weights_files, backends, images, batch_size=8, min_iou=0.5):
+    summary, per_class = [], []
+    for weights in weights_files:
+        path = resolve_weights(weights)
+        reference = None
+        # FP32 PyTorch runs first; it is the reference every variant is compared with
+        for backend in ["pytorch"] + [b for b in backends if b != "pytorch"]:
+            model = load_yolo(path, backend)
+            latency, results = time_latency(model, images)
+            detections = [detections_from_result(result) for result in results]
+            if reference is None:
+                reference = detections
+            agreement = agreement_rows(model, reference, detections, min_iou)
+            if backend not in backends:
+                continue
+            summary.append({
+                "Weights": weights,
+                "Backend": backend,
+                "Latency ms (mean)": round(float(latency.mean()), 1),
+                "Latency ms (p95)": round(float(np.percentile(latency, 95)), 1),
+                "Images/s": round(time_throughput(model, images, batch_size), 1),
+                "Agreement": round(float(np.mean(list(agreement.values()))), 3) if agreement else 1.0,
+            })
+            per_class.extend(
+                {"Weights": weights, "Backend": backend, "Class": name, "Agreement": round(value, 3)}
+                for name, value in sorted(agreement.items())
+            )
+    return pd.DataFrame(summary), pd.DataFrame(per_class)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark latency, throughput and accuracy of the model variants.")
+    parser.add_argument("images", help="Folder of test images")
+    parser.add_argument("--weights", nargs="+", default=None, help="Weights files (default: every bundled .pt)")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--limit", type=int, default=100, help="Maximum number of test images")
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per call when measuring throughput")
+    parser.add_argument("--min-iou", type=float, default=0.5, help="Overlap a box needs to count as the same detection")
+    parser.add_argument("--output", default=None, help="Also write the per-class agreement table to this CSV")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    names, images = load_images(args.images, args.limit)
+    if not images:
+        print(f"No images found in {args.images}")
+        return 1
+
+    summary, per_class = benchmark(args.weights or available_weights(), args.backends, images, args.batch_size, args.min_iou)
+    print(f"{len(images)} images\n")
+    print(summary.to_string(index=False))
+    if not per_class.empty:
+        print()
+        print(per_class.pivot_table(index=["Weights", "Class"], columns="Backend", values="Agreement").to_string())
+    if args.output:
+        per_class.to_csv(args.output, index=False)
+        print(f"\nWrote per-class agreement to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
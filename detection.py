@@ -0,0 +1,282 @@
+import hashlib
+import os
+import tempfile
+import threading
+import zipfile
+from collections import OrderedDict, namedtuple
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from ppe_profile import load_profile
+
+# PPE checklist rows shown in the app and in the PDF report, loaded once from the PPE profile
+PROFILE = load_profile()
+PPE_OPTIONS = PROFILE.options
+PPE_ITEMS = PROFILE.ppe_items
+
+# Box colors per detector class
+CLASS_COLORS = {
+    "hairnet": (255, 0, 0),    # Blue
+    "goggles": (255, 255, 255), # White
+    "mask": (0, 0, 255),        # Red
+    "full-body suit": (0, 255, 0), # Green
+    "gloves": (42, 42, 165),    # Brown
+    "shoes": (0, 0, 0)          # Black
+}
+DEFAULT_COLOR = (0, 255, 0)  # Green for classes without a color
+
+
+def ppe_table(statuses):
+    # PPE checklist DataFrame from one "Safe"/"Unsafe"/"N/A" status per profile row
+    ppe_df = pd.DataFrame({
+        "Checklist": PROFILE.options,
+        "PPE": PROFILE.ppe_items,
+        "N/A": np.where(statuses == "N/A", "☑", "☐"),
+        "Safe": np.where(statuses == "Safe", "☑", "☐"),
+        "Unsafe": np.where(statuses == "Unsafe", "☑", "☐"),
+    })
+    ppe_df.index += 1
+    ppe_df.index.name = "No."
+    return ppe_df
+
+
+def build_ppe_table(detected_classes, sections):
+    # Fill the PPE checklist from the class names found in one image
+    return ppe_table(PROFILE.statuses(PROFILE.present_from_names(detected_classes), sections))
+
+
+def build_ppe_table_from_ids(class_ids, names, sections):
+    # Same, straight from the detected class ids of a model with class names `names`
+    return ppe_table(PROFILE.statuses(PROFILE.present_from_ids(class_ids, names), sections))
+
+
+def checklist_status(ppe_df):
+    # "Safe", "Unsafe" or "N/A" for every checklist row, without iterating over the rows
+    return np.select(
+        [ppe_df["Safe"].to_numpy() == "☑", ppe_df["Unsafe"].to_numpy() == "☑"],
+        ["Safe", "Unsafe"],
+        default="N/A",
+    )
+
+
+def detect_batch(model, images, batch_size=8):
+    # Run the model on several images with one call per batch instead of one call per image
+    results = []
+    for start in range(0, len(images), batch_size):
+        results.extend(model(list(images[start:start + batch_size])))
+    return results
+
+
+def frame_summary(frame_classes, sections):
+    # One row per frame: status of every PPE item plus the number of safe/unsafe items,
+    # so the best or worst frame can be picked without running the model again
+    frame_indices = list(frame_classes.keys())
+    present = np.array([PROFILE.present_from_names(frame_classes[i]) for i in frame_indices]).reshape(len(frame_indices), len(PPE_OPTIONS))
+    statuses = PROFILE.statuses(present, sections)
+
+    summary = pd.DataFrame(statuses, columns=PROFILE.ppe_items, index=frame_indices)
+    summary.insert(0, "Frame", [f"Frame {i + 1}" for i in frame_indices])
+    summary["Safe items"] = (statuses == "Safe").sum(axis=1)
+    summary["Unsafe items"] = (statuses == "Unsafe").sum(axis=1)
+    return summary
+
+
+# Compact detection result: boxes (N, 4) as x1, y1, x2, y2, class ids (N,) and confidences (N,)
+Detections = namedtuple("Detections", ["xyxy", "cls", "conf"])
+
+
+def detections_from_result(result):
+    # RemoteModel (inference service) already returns Detections; local models, including
+    # ONNX and OpenVINO exports loaded through YOLO, return ultralytics Results
+    if isinstance(result, Detections):
+        return result
+    boxes = result.boxes
+    return Detections(
+        xyxy=boxes.xyxy.cpu().numpy().astype(np.float32),
+        cls=boxes.cls.cpu().numpy().astype(np.int32),
+        conf=boxes.conf.cpu().numpy().astype(np.float32),
+    )
+
+
+def model_identity(model):
+    # Weights loaded through model_registry carry their content hash; exported backends
+    # can differ slightly from PyTorch, so their results are cached separately
+    identity = getattr(model, "weights_sha256", None) or str(getattr(model, "ckpt_path", None) or id(model))
+    backend = getattr(model, "backend", "pytorch")
+    return identity if backend == "pytorch" else f"{identity}|{backend}"
+
+
+def detection_key(image, model, **params):
+    # Hash of the pixels plus the model and the inference parameters used
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(image).tobytes())
+    digest.update(f"{image.shape}|{image.dtype}|{model_identity(model)}|{sorted(params.items())}".encode())
+    return digest.hexdigest()
+
+
+class DetectionCache:
+    # LRU cache of Detections bounded by memory size, optionally backed by .npz files on disk
+    # (the folder is bounded by max_disk_bytes, least recently used files deleted first)
+    def __init__(self, max_bytes=32 * 1024 * 1024, cache_dir=None, max_disk_bytes=256 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._disk_bytes = 0
+        self._lock = threading.Lock()
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_entries())
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, key + ".npz")
+
+    def _remember(self, key, detections):
+        size = sum(array.nbytes for array in detections)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return
+            self._entries[key] = detections
+            self._bytes += size
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= sum(array.nbytes for array in evicted)
+
+    def get(self, key):
+        with self._lock:
+            detections = self._entries.get(key)
+            if detections is not None:
+                self._entries.move_to_end(key)
+                return detections
+
+        path = self._disk_path(key) if self.cache_dir else None
+        if path and os.path.exists(path):
+            try:
+                with np.load(path) as data:
+                    detections = Detections(data["xyxy"], data["cls"], data["conf"])
+                os.utime(path, None)  # Mark as recently used for disk eviction
+            except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+                # Damaged entry: drop it so the image is detected again and re-cached
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                return None
+            self._remember(key, detections)
+            return detections
+        return None
+
+    def put(self, key, detections):
+        self._remember(key, detections)
+        if self.cache_dir:
+            self._write_disk(key, detections)
+
+    def _write_disk(self, key, detections):
+        # Written to a temporary file and renamed, so readers never see a half-written entry
+        fd, partial_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".part")
+        try:
+            with os.fdopen(fd, "wb") as out:
+                np.savez(out, xyxy=detections.xyxy, cls=detections.cls, conf=detections.conf)
+            size = os.path.getsize(partial_path)
+            os.replace(partial_path, self._disk_path(key))
+        except OSError:
+            try:
+                os.remove(partial_path)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self._disk_bytes += size
+            over_limit = self._disk_bytes > self.max_disk_bytes
+        if over_limit:
+            self._evict_disk()
+
+    def _disk_entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".npz"):
+                try:
+                    stat = os.stat(os.path.join(self.cache_dir, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, name)))
+        return entries
+
+    def _evict_disk(self):
+        # Delete least recently used files until the folder is back under 90% of the limit,
+        # so eviction does not run again on every put
+        entries = self._disk_entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= 0.9 * self.max_disk_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        with self._lock:
+            self._disk_bytes = total
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+
+# Shared by every session of the server process; set BANTAI_DETECTION_CACHE_DIR to also keep results on disk
+detection_cache = DetectionCache(cache_dir=os.environ.get("BANTAI_DETECTION_CACHE_DIR"))
+
+
+def detect_cached(model, image, **params):
+    # Detections for one image, running the model only on a cache miss
+    return detect_batch_cached(model, [image], **params)[0]
+
+
+def detect_batch_cached(model, images, batch_size=8, **params):
+    keys = [detection_key(image, model, **params) for image in images]
+    detections = [detection_cache.get(key) for key in keys]
+
+    # Batch only the images that are not cached yet
+    missing = [i for i, cached in enumerate(detections) if cached is None]
+    for start in range(0, len(missing), batch_size):
+        chunk = missing[start:start + batch_size]
+        results = model([images[i] for i in chunk], **params)
+        for i, result in zip(chunk, results):
+            detections[i] = detections_from_result(result)
+            detection_cache.put(keys[i], detections[i])
+    return detections
+
+
+def annotate(image, detections, names, colors=CLASS_COLORS):
+    # Draw all boxes and labels in place and return the detected class names.
+    # Boxes, class ids and colors are converted to plain Python values once for the
+    # whole array; names and colors are looked up once per distinct class.
+    if len(detections.cls) == 0:
+        return []
+
+    class_ids, box_class = np.unique(detections.cls, return_inverse=True)
+    labels = [names[int(class_id)] for class_id in class_ids]
+    label_colors = [tuple(int(c) for c in colors.get(label, DEFAULT_COLOR)) for label in labels]
+
+    boxes = detections.xyxy.astype(np.int32)
+    for (x1, y1, x2, y2), k in zip(boxes.tolist(), box_class.tolist()):
+        cv2.rectangle(image, (x1, y1), (x2, y2), label_colors[k], 2)
+        cv2.putText(image, labels[k], (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, label_colors[k], 1)
+
+    return [labels[k] for k in box_class.tolist()]
+
+
+WORKER_COLOR = (255, 165, 0)  # Orange
+
+
+def draw_workers(image, workers):
+    # Outline and label (worker id, box) pairs in place
+    for worker_id, box in workers:
+        x1, y1, x2, y2 = (int(v) for v in box)
+        cv2.rectangle(image, (x1, y1), (x2, y2), WORKER_COLOR, 2)
+        cv2.putText(image, f"Worker {worker_id}", (x1, max(y1 - 10, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, WORKER_COLOR, 2)
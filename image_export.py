@@ -0,0 +1,91 @@
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+# Download formats: JPEG/WebP for quick previews, PNG (lossless) for the archive
+IMAGE_FORMATS = {
+    "PNG": ("image/png", ".png"),
+    "JPEG": ("image/jpeg", ".jpg"),
+    "WebP": ("image/webp", ".webp"),
+}
+
+MAX_CACHE_BYTES = 64 * 1024 * 1024
+
+# Encoding runs here instead of on the Streamlit script thread
+_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="image-encode")
+_encoded = OrderedDict()  # (digest, format, quality) -> Future of (bytes, mime, extension)
+_encoded_bytes = 0
+_lock = threading.Lock()
+
+
+def encode_image(image_rgb, image_format="PNG", quality=90):
+    mime, extension = IMAGE_FORMATS[image_format]
+    buffer = io.BytesIO()
+    image = Image.fromarray(image_rgb)
+    if image_format == "PNG":
+        image.save(buffer, format="PNG", compress_level=6)
+    else:
+        image.save(buffer, format=image_format.upper(), quality=int(quality))
+    return buffer.getvalue(), mime, extension
+
+
+def image_digest(image):
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(image).tobytes())
+    digest.update(f"{image.shape}|{image.dtype}".encode())
+    return digest.hexdigest()
+
+
+def _remember(key, future):
+    # Count an encoded result against the cache budget once it is done, evicting the oldest
+    global _encoded_bytes
+    if future.exception() is not None:
+        with _lock:
+            if _encoded.get(key) is future:
+                del _encoded[key]
+        return
+    with _lock:
+        if _encoded.get(key) is not future:
+            return
+        _encoded_bytes += len(future.result()[0])
+        while _encoded_bytes > MAX_CACHE_BYTES and len(_encoded) > 1:
+            old_key, old = next(iter(_encoded.items()))
+            if not old.done():
+                break
+            del _encoded[old_key]
+            _encoded_bytes -= len(old.result()[0])
+
+
+def _submit(key, job, *args):
+    with _lock:
+        future = _encoded.get(key)
+        if future is not None:
+            _encoded.move_to_end(key)
+            return future
+        future = _executor.submit(job, *args)
+        _encoded[key] = future
+    future.add_done_callback(lambda f: _remember(key, f))
+    return future
+
+
+def encode_async(image_rgb, image_format="PNG", quality=90, key=None):
+    # Future of (bytes, mime, extension). The same annotated image in the same format is
+    # encoded once; later requests (e.g. on reruns) reuse the finished or running job.
+    key = (key or image_digest(image_rgb), image_format, None if image_format == "PNG" else int(quality))
+    return _submit(key, encode_image, image_rgb, image_format, quality)
+
+
+def export_async(key, make_image, image_format="PNG", quality=90):
+    # Like encode_async, but the image itself is also produced in the background by
+    # `make_image()` (e.g. decoding and annotating a full-resolution original)
+    key = (key, image_format, None if image_format == "PNG" else int(quality))
+    return _submit(key, lambda: encode_image(make_image(), image_format, quality))
+
+
+def encoded_image(image_rgb, image_format="PNG", quality=90, key=None):
+    return encode_async(image_rgb, image_format, quality, key).result()
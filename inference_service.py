@@ -0,0 +1,241 @@
+"""Local inference service shared by all Streamlit sessions on one machine.
+
+Start it next to the app and point the app at it:
+
+    python inference_service.py --port 8600
+    BANTAI_INFERENCE_URL=http://127.0.0.1:8600 streamlit run app.py
+
+The service owns the YOLO model(s). Requests that arrive within a short window
+are grouped into one batched model call, so throughput improves under load
+instead of every session competing for the CPU with its own model copy.
+"""
+import argparse
+import io
+import json
+import queue
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from detection import Detections, detections_from_result
+from backends import BACKENDS
+from model_registry import DEFAULT_WEIGHTS, get_model
+
+
+class MicroBatcher:
+    # Collects single-image requests and runs them through the model in batches:
+    # a batch is sent as soon as it is full or `max_wait` seconds after its first request
+    def __init__(self, model, max_batch_size=8, max_wait=0.01):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.requests = queue.Queue()
+        self.batches = 0
+        self.images = 0
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+
+    def predict(self, image, timeout=60.0):
+        request = {"image": image, "done": threading.Event(), "detections": None, "error": None}
+        self.requests.put(request)
+        if not request["done"].wait(timeout):
+            raise TimeoutError("Inference request timed out")
+        if request["error"] is not None:
+            raise request["error"]
+        return request["detections"]
+
+    def _run(self):
+        while True:
+            batch = [self.requests.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.requests.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            try:
+                results = self.model([request["image"] for request in batch])
+                for request, result in zip(batch, results):
+                    request["detections"] = detections_from_result(result)
+            except Exception as e:
+                for request in batch:
+                    request["error"] = e
+            finally:
+                self.batches += 1
+                self.images += len(batch)
+                for request in batch:
+                    request["done"].set()
+
+
+class InferenceService:
+    # One micro-batcher per weights version; the model itself comes from the shared registry
+    def __init__(self, max_batch_size=8, max_wait=0.01, backend=None):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.backend = backend
+        self._batchers = {}
+        self._lock = threading.Lock()
+
+    def batcher(self, weights):
+        model = get_model(weights, self.backend)
+        with self._lock:
+            batcher = self._batchers.get(model.weights_key)
+            if batcher is None:
+                batcher = MicroBatcher(model, self.max_batch_size, self.max_wait)
+                self._batchers[model.weights_key] = batcher
+            return batcher
+
+    def info(self, weights):
+        model = get_model(weights, self.backend)
+        return {
+            "names": {int(k): v for k, v in model.names.items()},
+            "weights_sha256": model.weights_sha256,
+            "weights_key": list(model.weights_key),
+            "backend": model.backend,
+        }
+
+    def stats(self):
+        with self._lock:
+            return [
+                {"weights": key[0], "batches": b.batches, "images": b.images,
+                 "mean_batch_size": round(b.images / b.batches, 2) if b.batches else 0.0}
+                for key, b in self._batchers.items()
+            ]
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _send_json(self, payload, status=200):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _weights(self):
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            return query.get("weights", [DEFAULT_WEIGHTS])[0]
+
+        def do_GET(self):
+            route = urllib.parse.urlparse(self.path).path
+            try:
+                if route == "/health":
+                    self._send_json({"status": "ok"})
+                elif route == "/info":
+                    self._send_json(service.info(self._weights()))
+                elif route == "/stats":
+                    self._send_json(service.stats())
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+            except Exception as e:
+                self._send_json({"error": str(e)}, status=500)
+
+        def do_POST(self):
+            if urllib.parse.urlparse(self.path).path != "/predict":
+                self._send_json({"error": "not found"}, status=404)
+                return
+            try:
+                # Body is a single image array saved with np.save (lossless, no decode cost)
+                length = int(self.headers.get("Content-Length", 0))
+                image = np.load(io.BytesIO(self.rfile.read(length)), allow_pickle=False)
+                detections = service.batcher(self._weights()).predict(image)
+                self._send_json({
+                    "xyxy": detections.xyxy.tolist(),
+                    "cls": detections.cls.tolist(),
+                    "conf": detections.conf.tolist(),
+                })
+            except Exception as e:
+                self._send_json({"error": str(e)}, status=500)
+
+        def log_message(self, format, *args):
+            pass  # Keep the console quiet; one line per frame is too much
+
+    return Handler
+
+
+class RemoteModel:
+    # Drop-in replacement for the in-process YOLO model used by app.py: same `names`,
+    # identity attributes and call style, but inference happens in the shared service
+    def __init__(self, url, weights=DEFAULT_WEIGHTS, timeout=60.0):
+        self.url = url.rstrip("/")
+        self.weights = weights
+        self.timeout = timeout
+        info = self._request("/info")
+        self.names = {int(k): v for k, v in info["names"].items()}
+        self.weights_sha256 = info["weights_sha256"]
+        self.weights_key = tuple(info["weights_key"])
+        # Part of model_identity, so detections of e.g. an onnx-int8 service are cached separately
+        self.backend = info.get("backend", "pytorch")
+
+    def _request(self, route, data=None):
+        query = urllib.parse.urlencode({"weights": self.weights})
+        request = urllib.request.Request(f"{self.url}{route}?{query}", data=data)
+        if data is not None:
+            request.add_header("Content-Type", "application/x-npy")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                payload = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            payload = json.loads(e.read() or b"{}") or {"error": str(e)}
+        if isinstance(payload, dict) and "error" in payload:
+            raise RuntimeError(payload["error"])
+        return payload
+
+    def _predict_one(self, image):
+        buffer = io.BytesIO()
+        np.save(buffer, np.ascontiguousarray(image), allow_pickle=False)
+        payload = self._request("/predict", data=buffer.getvalue())
+        return Detections(
+            xyxy=np.asarray(payload["xyxy"], dtype=np.float32).reshape(-1, 4),
+            cls=np.asarray(payload["cls"], dtype=np.int32),
+            conf=np.asarray(payload["conf"], dtype=np.float32),
+        )
+
+    def __call__(self, images):
+        # Returns one Detections per image. Images are sent as separate concurrent
+        # requests so the service can batch them together with other sessions' work.
+        if isinstance(images, np.ndarray):
+            images = [images]
+        images = list(images)
+        if len(images) == 1:
+            return [self._predict_one(images[0])]
+        with ThreadPoolExecutor(max_workers=len(images)) as executor:
+            return list(executor.map(self._predict_one, images))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve PPE detection to local app sessions with request micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--weights", default=DEFAULT_WEIGHTS, help="Weights to load at start-up")
+    parser.add_argument("--backend", choices=BACKENDS, default=None, help="Inference backend (default: BANTAI_BACKEND or pytorch)")
+    parser.add_argument("--max-batch-size", type=int, default=8)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0, help="How long a batch waits for more requests")
+    args = parser.parse_args(argv)
+
+    service = InferenceService(max_batch_size=args.max_batch_size, max_wait=args.max_wait_ms / 1000.0, backend=args.backend)
+    service.batcher(args.weights)  # Load the model before the first request arrives
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Inference service listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import queue
+import threading
+import time
+from collections import deque
+
+import cv2
+
+from detection import annotate, detections_from_result, draw_workers
+from preview import scale_detections
+
+
+def put_latest(q, item):
+    # Keep only the newest item: if the consumer is behind, the stale item is dropped
+    # instead of queueing up more latency. Returns True when something was dropped.
+    dropped = False
+    while True:
+        try:
+            q.put_nowait(item)
+            return dropped
+        except queue.Full:
+            try:
+                q.get_nowait()
+                dropped = True
+            except queue.Empty:
+                pass
+
+
+class StageTimer:
+    # Rolling per-stage timings (last `window` samples)
+    def __init__(self, window=30):
+        self._durations = deque(maxlen=window)
+        self._stamps = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds):
+        with self._lock:
+            self._durations.append(seconds)
+            self._stamps.append(time.perf_counter())
+
+    def mean_ms(self):
+        with self._lock:
+            if not self._durations:
+                return 0.0
+            return 1000.0 * sum(self._durations) / len(self._durations)
+
+    def fps(self):
+        # Rate at which this stage completes items
+        with self._lock:
+            if len(self._stamps) < 2:
+                return 0.0
+            elapsed = self._stamps[-1] - self._stamps[0]
+            return (len(self._stamps) - 1) / elapsed if elapsed > 0 else 0.0
+
+
+class MotionGate:
+    # Decides whether a live frame is worth running the model on. Frames are compared
+    # with the last frame that was inferred, as mean absolute difference of small grey
+    # images (0-255 scale); below `threshold` the scene counts as unchanged. A frame is
+    # inferred anyway once the last result is `max_staleness` seconds old.
+    def __init__(self, threshold=2.0, max_staleness=2.0, width=160):
+        self.threshold = threshold
+        self.max_staleness = max_staleness
+        self.width = width
+        self.last_motion = 0.0
+        self._reference = None
+        self._reference_time = 0.0
+
+    def _small_grey(self, frame_rgb):
+        height = max(1, round(frame_rgb.shape[0] * self.width / frame_rgb.shape[1]))
+        small = cv2.resize(frame_rgb, (self.width, height), interpolation=cv2.INTER_AREA)
+        return cv2.GaussianBlur(cv2.cvtColor(small, cv2.COLOR_RGB2GRAY), (5, 5), 0)
+
+    def should_infer(self, frame_rgb):
+        grey = self._small_grey(frame_rgb)
+        now = time.perf_counter()
+        if self._reference is not None and self._reference.shape == grey.shape:
+            self.last_motion = float(cv2.absdiff(grey, self._reference).mean())
+            if self.last_motion < self.threshold and now - self._reference_time < self.max_staleness:
+                return False
+        self._reference = grey
+        self._reference_time = now
+        return True
+
+
+class LivePipeline:
+    # Capture -> inference -> encode -> render, each stage on its own clock.
+    # Capture, inference and encode run in background threads; render happens on
+    # the Streamlit script thread (the only thread allowed to update the page) by
+    # calling get() in a loop. Queues hold a single frame so every stage always
+    # works on the newest available data and the displayed FPS is set by the
+    # slowest stage rather than by the sum of all of them.
+    # The encode stage sends at most `display_fps` frames per second to the
+    # browser, as JPEGs at most `display_width` wide, independent of the
+    # inference rate; if the page cannot keep up, older frames are dropped.
+    # With a SessionTracker the model only runs on every Nth frame and the
+    # tracker carries the boxes forward in between. With a MotionGate, frames of
+    # a static scene skip both and reuse the last boxes.
+    def __init__(self, cap, model, queue_size=1, tracker=None, gate=None,
+                 display_fps=10.0, display_width=640, jpeg_quality=70):
+        self.cap = cap
+        self.model = model
+        self.tracker = tracker
+        self.gate = gate
+        self.display_fps = display_fps
+        self.display_width = display_width
+        self.jpeg_quality = jpeg_quality
+        self.frames = queue.Queue(maxsize=queue_size)
+        self.results = queue.Queue(maxsize=queue_size)
+        self.views = queue.Queue(maxsize=queue_size)
+        self.timers = {
+            "capture": StageTimer(),
+            "inference": StageTimer(),
+            "tracking": StageTimer(),
+            "encode": StageTimer(),
+            "render": StageTimer(),
+        }
+        self.dropped_frames = 0
+        self.dropped_results = 0
+        self.skipped_frames = 0
+        self.throttled_frames = 0
+        self.dropped_views = 0
+        self.error = None
+        self._stop_event = threading.Event()
+        self._threads = []
+
+    def start(self):
+        self._threads = [
+            threading.Thread(target=self._capture_loop, name="live-capture", daemon=True),
+            threading.Thread(target=self._inference_loop, name="live-inference", daemon=True),
+            threading.Thread(target=self._encode_loop, name="live-encode", daemon=True),
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
+    def _capture_loop(self):
+        while not self._stop_event.is_set():
+            start = time.perf_counter()
+            ret, frame = self.cap.read()
+            if not ret:
+                self.error = "Failed to capture frame"
+                self._stop_event.set()
+                break
+
+            # Convert frame to RGB for Streamlit
+            frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            self.timers["capture"].add(time.perf_counter() - start)
+
+            if put_latest(self.frames, frame_rgb):
+                self.dropped_frames += 1
+
+    def _inference_loop(self):
+        last = None
+        while not self._stop_event.is_set():
+            try:
+                frame_rgb = self.frames.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+            start = time.perf_counter()
+            if last is not None and self.gate is not None and not self.gate.should_infer(frame_rgb):
+                # Nothing moved: draw the previous boxes on the new frame
+                self.skipped_frames += 1
+                if put_latest(self.results, (frame_rgb,) + last[1:]):
+                    self.dropped_results += 1
+                continue
+
+            try:
+                if self.tracker is not None and not self.tracker.needs_detection():
+                    detections = self.tracker.track(frame_rgb)
+                    self.timers["tracking"].add(time.perf_counter() - start)
+                else:
+                    # Keep only compact NumPy arrays so the render stage does no tensor conversion
+                    detections = detections_from_result(self.model(frame_rgb)[0])
+                    if self.tracker is not None:
+                        self.tracker.update(frame_rgb, detections)
+                    self.timers["inference"].add(time.perf_counter() - start)
+            except Exception as e:
+                self.error = f"An error occurred during model inference: {e}"
+                self._stop_event.set()
+                break
+
+            tracks = self.tracker.track_boxes() if self.tracker is not None else []
+            last = (frame_rgb, detections, tracks)
+            if put_latest(self.results, last):
+                self.dropped_results += 1
+
+    def _encode_loop(self):
+        # Results are (frame_rgb, detections, tracks); `tracks` lists (worker id, box)
+        # pairs when a tracker is attached. A result that arrives before the next
+        # display slot waits there and is replaced if a newer one comes in.
+        interval = 1.0 / self.display_fps if self.display_fps else 0.0
+        next_due = 0.0
+        pending = None
+        while not self._stop_event.is_set():
+            wait = max(0.0, next_due - time.perf_counter()) if pending is not None else 0.1
+            try:
+                item = self.results.get(timeout=wait)
+                if pending is not None:
+                    self.throttled_frames += 1
+                pending = item
+            except queue.Empty:
+                pass
+            if pending is None or time.perf_counter() < next_due:
+                continue
+
+            (frame_rgb, detections, tracks), pending = pending, None
+            start = time.perf_counter()
+            next_due = start + interval
+
+            # Draw at display size: less to draw and to encode
+            scale = min(1.0, self.display_width / frame_rgb.shape[1])
+            if scale < 1.0:
+                frame_rgb = cv2.resize(frame_rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+                detections = scale_detections(detections, scale)
+                tracks = [(worker_id, box * scale) for worker_id, box in tracks]
+            detected_classes = set(annotate(frame_rgb, detections, self.model.names))
+            draw_workers(frame_rgb, tracks)
+
+            ok, jpeg = cv2.imencode(".jpg", cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2BGR), [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+            self.timers["encode"].add(time.perf_counter() - start)
+            if ok and put_latest(self.views, (jpeg.tobytes(), detected_classes)):
+                self.dropped_views += 1
+
+    def get(self, timeout=1.0):
+        # Newest (jpeg_bytes, detected_classes) view, or None if nothing arrived in time
+        try:
+            return self.views.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def record_render(self, seconds):
+        self.timers["render"].add(seconds)
+
+    def stats(self):
+        return {
+            "capture_ms": self.timers["capture"].mean_ms(),
+            "inference_ms": self.timers["inference"].mean_ms(),
+            "tracking_ms": self.timers["tracking"].mean_ms(),
+            "encode_ms": self.timers["encode"].mean_ms(),
+            "render_ms": self.timers["render"].mean_ms(),
+            "display_fps": self.timers["render"].fps(),
+            "dropped_frames": self.dropped_frames,
+            "dropped_results": self.dropped_results,
+            "skipped_frames": self.skipped_frames,
+            "throttled_frames": self.throttled_frames,
+            "dropped_views": self.dropped_views,
+        }
+
+    def stats_text(self):
+        s = self.stats()
+        return (
+            f"Capture {s['capture_ms']:.1f} ms | Inference {s['inference_ms']:.1f} ms | "
+            f"Tracking {s['tracking_ms']:.1f} ms | Encode {s['encode_ms']:.1f} ms | "
+            f"Render {s['render_ms']:.1f} ms | {s['display_fps']:.1f} FPS | "
+            f"Dropped {s['dropped_frames']} frames, {s['dropped_results']} results | "
+            f"Skipped {s['skipped_frames']} static frames | "
+            f"Not sent {s['throttled_frames']} (rate cap), {s['dropped_views']} (page behind)"
+        )
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout=timeout)
+        self._threads = []
@@ -0,0 +1,103 @@
+import glob
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from backends import DEFAULT_BACKEND, check_backend, load_yolo
+
+# Folder that holds the bundled weights (my_model.pt, best (3).pt, best (4).pt)
+WEIGHTS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_WEIGHTS = "my_model.pt"
+
+# Maximum number of distinct weights kept in memory at the same time
+MAX_LOADED_MODELS = 4
+
+# Streamlit re-executes app.py on every interaction, but imported modules stay in
+# sys.modules, so this dict lives for the whole server process and is shared by
+# every session.
+_models = OrderedDict()
+_registry_lock = threading.Lock()
+_load_locks = {}
+
+
+def resolve_weights(path):
+    # Relative names are looked up next to the app, not in the current working directory
+    if not os.path.isabs(path):
+        path = os.path.join(WEIGHTS_DIR, path)
+    return os.path.realpath(path)
+
+
+def weights_key(path):
+    # Path plus modification time and size identifies one version of a weights file,
+    # so replacing the file on disk produces a new key and the next call reloads it.
+    path = resolve_weights(path)
+    stat = os.stat(path)
+    return (path, stat.st_mtime_ns, stat.st_size)
+
+
+def file_sha256(path, chunk_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def available_weights(folder=WEIGHTS_DIR):
+    # List the .pt files that can be picked in the sidebar, default model first
+    names = sorted(os.path.basename(p) for p in glob.glob(os.path.join(folder, "*.pt")))
+    if DEFAULT_WEIGHTS in names:
+        names.remove(DEFAULT_WEIGHTS)
+        names.insert(0, DEFAULT_WEIGHTS)
+    return names
+
+
+def get_model(path=DEFAULT_WEIGHTS, backend=None):
+    # `backend` defaults to BANTAI_BACKEND; the same weights on another backend are a separate entry
+    key = weights_key(path) + (check_backend(backend or DEFAULT_BACKEND),)
+
+    with _registry_lock:
+        model = _models.get(key)
+        if model is not None:
+            _models.move_to_end(key)
+            return model
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+
+    # Only one session loads a given file; the others wait and reuse its result
+    with load_lock:
+        with _registry_lock:
+            model = _models.get(key)
+            if model is not None:
+                _models.move_to_end(key)
+                return model
+
+        model = load_yolo(key[0], key[3])
+        model.weights_key = key
+        model.weights_sha256 = file_sha256(key[0])
+        model.backend = key[3]
+
+        with _registry_lock:
+            # Drop older versions of the same file (hot-swap) and the least recently used extras
+            for old_key in [k for k in _models if k[0] == key[0] and k[3] == key[3]]:
+                del _models[old_key]
+            _models[key] = model
+            while len(_models) > MAX_LOADED_MODELS:
+                _models.popitem(last=False)
+            _load_locks.pop(key, None)
+
+    return model
+
+
+def loaded_models():
+    # Snapshot of what is currently held in memory, for display/debugging
+    with _registry_lock:
+        return [
+            {"weights": os.path.basename(path), "mtime_ns": mtime_ns, "size": size, "backend": backend}
+            for path, mtime_ns, size, backend in _models
+        ]
+
+
+def clear_models():
+    with _registry_lock:
+        _models.clear()
@@ -0,0 +1,170 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from detection import detections_from_result
+from live_pipeline import StageTimer, put_latest
+
+
+def parse_sources(text):
+    # One source per line: a camera index, an RTSP/HTTP URL or a video file path
+    sources = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line:
+            sources.append(int(line) if line.isdigit() else line)
+    return sources
+
+
+class CameraSource:
+    # Capture thread for one camera: keeps only its newest frame, stamped with the capture time
+    def __init__(self, name, source):
+        self.name = name
+        self.source = source
+        self.frames = queue.Queue(maxsize=1)
+        self.results = queue.Queue(maxsize=1)
+        self.capture_timer = StageTimer()
+        self.inference_timer = StageTimer()  # Completed results, for the per-source FPS
+        self.latency = StageTimer()          # Capture to result
+        self.dropped_frames = 0
+        self.error = None
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._capture_loop, name=f"capture-{name}", daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set()
+
+    def _capture_loop(self):
+        cap = cv2.VideoCapture(self.source)
+        if not cap.isOpened():
+            self.error = f"Could not open {self.source}"
+            self._stop_event.set()
+            return
+        # Cameras and streams deliver frames in real time; a video file would be read as fast as
+        # it decodes, so it is paced to its own frame rate
+        fps = cap.get(cv2.CAP_PROP_FPS) if isinstance(self.source, str) and os.path.isfile(self.source) else 0.0
+        frame_interval = 1.0 / fps if fps > 0 else 0.0
+        try:
+            while not self._stop_event.is_set():
+                start = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    self.error = "Stream ended"
+                    break
+                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                self.capture_timer.add(time.perf_counter() - start)
+                if put_latest(self.frames, (time.perf_counter(), frame_rgb)):
+                    self.dropped_frames += 1
+                if frame_interval:
+                    self._stop_event.wait(frame_interval - (time.perf_counter() - start))
+        finally:
+            cap.release()
+            self._stop_event.set()
+
+    def take_frame(self):
+        try:
+            return self.frames.get_nowait()
+        except queue.Empty:
+            return None
+
+    def latest(self):
+        # Newest (frame_rgb, detections) pair, or None if nothing new arrived
+        try:
+            return self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def stats(self):
+        return {
+            "Source": self.name,
+            "Status": self.error or "running",
+            "FPS": round(self.inference_timer.fps(), 1),
+            "Latency (ms)": round(self.latency.mean_ms(), 1),
+            "Capture (ms)": round(self.capture_timer.mean_ms(), 1),
+            "Dropped frames": self.dropped_frames,
+        }
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+
+class MultiCameraMonitor:
+    # Several capture threads feeding one inference thread. Each round the worker takes
+    # the newest frame of up to `max_batch_size` sources and runs them as one batch.
+    # Sources are visited round-robin from a rotating start, so with more cameras than
+    # batch slots every camera still gets its turn and none can starve the others.
+    def __init__(self, sources, model, max_batch_size=4):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.sources = [CameraSource(f"Camera {i + 1}: {source}", source) for i, source in enumerate(sources)]
+        self.batch_timer = StageTimer()
+        self.error = None
+        self._next = 0
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._inference_loop, name="multi-camera-inference", daemon=True)
+
+    def start(self):
+        for source in self.sources:
+            source.start()
+        self._thread.start()
+        return self
+
+    @property
+    def running(self):
+        return not self._stop_event.is_set() and any(source.running for source in self.sources)
+
+    def _next_batch(self):
+        batch = []
+        count = len(self.sources)
+        for k in range(count):
+            source = self.sources[(self._next + k) % count]
+            item = source.take_frame()
+            if item is not None:
+                batch.append((source, item))
+                if len(batch) == self.max_batch_size:
+                    self._next = (self._next + k + 1) % count
+                    return batch
+        self._next = (self._next + 1) % count
+        return batch
+
+    def _inference_loop(self):
+        while not self._stop_event.is_set():
+            batch = self._next_batch()
+            if not batch:
+                time.sleep(0.005)
+                continue
+
+            start = time.perf_counter()
+            try:
+                results = self.model([frame_rgb for _, (_, frame_rgb) in batch])
+            except Exception as e:
+                self.error = f"An error occurred during model inference: {e}"
+                self._stop_event.set()
+                break
+            done = time.perf_counter()
+            self.batch_timer.add(done - start)
+
+            for (source, (captured, frame_rgb)), result in zip(batch, results):
+                put_latest(source.results, (frame_rgb, detections_from_result(result)))
+                source.inference_timer.add(done - start)
+                source.latency.add(done - captured)
+
+    def stats(self):
+        return [source.stats() for source in self.sources]
+
+    def stop(self, timeout=2.0):
+        self._stop_event.set()
+        for source in self.sources:
+            source.stop(timeout)
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
@@ -0,0 +1,238 @@
+import io
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime
+
+import pandas as pd
+from PIL import Image
+
+from detection import checklist_status
+
+# SQLite file next to the app unless BANTAI_DB_PATH points elsewhere
+DB_PATH = os.environ.get("BANTAI_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "observations.db"))
+
+THUMBNAIL_SIZE = (320, 320)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS observations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at TEXT NOT NULL,
+    date TEXT NOT NULL,
+    time TEXT,
+    location TEXT,
+    supervisor TEXT,
+    source TEXT,
+    description TEXT,
+    intervention TEXT,
+    positive_behaviour TEXT,
+    near_miss TEXT,
+    detections TEXT
+);
+CREATE TABLE IF NOT EXISTS observation_items (
+    observation_id INTEGER NOT NULL REFERENCES observations(id) ON DELETE CASCADE,
+    item_no INTEGER NOT NULL,
+    checklist TEXT NOT NULL,
+    ppe TEXT NOT NULL,
+    status TEXT NOT NULL,
+    PRIMARY KEY (observation_id, item_no)
+);
+CREATE TABLE IF NOT EXISTS observation_images (
+    observation_id INTEGER PRIMARY KEY REFERENCES observations(id) ON DELETE CASCADE,
+    mime TEXT NOT NULL,
+    thumbnail BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_observations_date ON observations(date);
+CREATE INDEX IF NOT EXISTS idx_observations_location_date ON observations(location, date);
+CREATE INDEX IF NOT EXISTS idx_observations_supervisor_date ON observations(supervisor, date);
+CREATE INDEX IF NOT EXISTS idx_items_checklist_status ON observation_items(checklist, status, observation_id);
+CREATE TABLE IF NOT EXISTS daily_rollups (
+    location TEXT NOT NULL,
+    date TEXT NOT NULL,
+    checklist TEXT NOT NULL,
+    na INTEGER NOT NULL DEFAULT 0,
+    safe INTEGER NOT NULL DEFAULT 0,
+    unsafe INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (location, date, checklist)
+);
+CREATE INDEX IF NOT EXISTS idx_rollups_date ON daily_rollups(date);
+"""
+
+# Adds one observation's checklist to its site/day counters
+ROLLUP_UPSERT = """
+INSERT INTO daily_rollups (location, date, checklist, na, safe, unsafe) VALUES (?, ?, ?, ?, ?, ?)
+ON CONFLICT (location, date, checklist) DO UPDATE SET
+    na = na + excluded.na, safe = safe + excluded.safe, unsafe = unsafe + excluded.unsafe
+"""
+
+_initialized = set()
+
+
+def connect(db_path=None):
+    # One short-lived connection per call keeps this safe to use from any Streamlit session/thread
+    db_path = db_path or DB_PATH
+    conn = sqlite3.connect(db_path, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA foreign_keys = ON")
+    if db_path not in _initialized:
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.executescript(SCHEMA)
+        if conn.execute("SELECT NOT EXISTS (SELECT 1 FROM daily_rollups)").fetchone()[0]:
+            rebuild_rollups(conn)  # Stores created before the rollups existed
+        _initialized.add(db_path)
+    return conn
+
+
+def make_thumbnail(image_rgb):
+    # Small JPEG of the annotated image; the full-size frame is not stored
+    image = Image.fromarray(image_rgb)
+    image.thumbnail(THUMBNAIL_SIZE)
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=80)
+    return buffer.getvalue()
+
+
+def save_observation(date, time, location, supervisor, ppe_df, description="", intervention="",
+                     positive_behaviour="", near_miss="", detections=None, image=None, source=None, db_path=None):
+    with closing(connect(db_path)) as conn, conn:
+        cursor = conn.execute(
+            "INSERT INTO observations (created_at, date, time, location, supervisor, source, description,"
+            " intervention, positive_behaviour, near_miss, detections) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (datetime.now().isoformat(timespec="seconds"), str(date), str(time), location, supervisor, source,
+             description, intervention, positive_behaviour, near_miss, json.dumps(list(detections or []))),
+        )
+        observation_id = cursor.lastrowid
+
+        if ppe_df is not None:
+            items = [
+                (observation_id, int(number), checklist, ppe, status)
+                for number, checklist, ppe, status in zip(ppe_df.index, ppe_df["Checklist"], ppe_df["PPE"], checklist_status(ppe_df))
+            ]
+            conn.executemany(
+                "INSERT INTO observation_items (observation_id, item_no, checklist, ppe, status) VALUES (?, ?, ?, ?, ?)",
+                items,
+            )
+            # Same transaction as the observation, so the rollups never drift from the raw rows
+            conn.executemany(ROLLUP_UPSERT, [
+                (location or "", str(date), checklist, int(status == "N/A"), int(status == "Safe"), int(status == "Unsafe"))
+                for _, _, checklist, _, status in items
+            ])
+
+        if image is not None:
+            conn.execute(
+                "INSERT INTO observation_images (observation_id, mime, thumbnail) VALUES (?, ?, ?)",
+                (observation_id, "image/jpeg", make_thumbnail(image)),
+            )
+    return observation_id
+
+
+def query_observations(location=None, supervisor=None, date_from=None, date_to=None,
+                       checklist=None, status=None, limit=500, db_path=None):
+    # Filtered list of observations (without thumbnails), newest first, e.g.
+    # query_observations(location="Site A", checklist="Hand Protection", status="Unsafe", date_from="2025-05-01")
+    conditions, params = [], []
+    if location:
+        conditions.append("o.location = ?")
+        params.append(location)
+    if supervisor:
+        conditions.append("o.supervisor = ?")
+        params.append(supervisor)
+    if date_from:
+        conditions.append("o.date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        conditions.append("o.date <= ?")
+        params.append(str(date_to))
+    if checklist or status:
+        # Uses the (checklist, status, observation_id) index instead of scanning observations
+        item_conditions = ["i.observation_id = o.id"]
+        if checklist:
+            item_conditions.append("i.checklist = ?")
+            params.append(checklist)
+        if status:
+            item_conditions.append("i.status = ?")
+            params.append(status)
+        conditions.append(f"EXISTS (SELECT 1 FROM observation_items i WHERE {' AND '.join(item_conditions)})")
+
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    sql = (
+        "SELECT o.id, o.date, o.time, o.location, o.supervisor, o.source,"
+        " (SELECT COUNT(*) FROM observation_items s WHERE s.observation_id = o.id AND s.status = 'Safe') AS safe,"
+        " (SELECT COUNT(*) FROM observation_items u WHERE u.observation_id = o.id AND u.status = 'Unsafe') AS unsafe"
+        f" FROM observations o {where} ORDER BY o.date DESC, o.id DESC LIMIT ?"
+    )
+    params.append(int(limit))
+    with closing(connect(db_path)) as conn:
+        return pd.read_sql_query(sql, conn, params=params)
+
+
+def load_observation(observation_id, db_path=None):
+    # Full record with its PPE checklist rebuilt as the app's ppe_df
+    with closing(connect(db_path)) as conn:
+        row = conn.execute("SELECT * FROM observations WHERE id = ?", (observation_id,)).fetchone()
+        if row is None:
+            return None
+        items = conn.execute(
+            "SELECT item_no, checklist, ppe, status FROM observation_items WHERE observation_id = ? ORDER BY item_no",
+            (observation_id,),
+        ).fetchall()
+
+    record = dict(row)
+    record["detections"] = json.loads(record["detections"] or "[]")
+    ppe_df = pd.DataFrame({
+        "Checklist": [item["checklist"] for item in items],
+        "PPE": [item["ppe"] for item in items],
+        "N/A": ["☑" if item["status"] == "N/A" else "☐" for item in items],
+        "Safe": ["☑" if item["status"] == "Safe" else "☐" for item in items],
+        "Unsafe": ["☑" if item["status"] == "Unsafe" else "☐" for item in items],
+    }, index=[item["item_no"] for item in items])
+    ppe_df.index.name = "No."
+    record["ppe_df"] = ppe_df
+    return record
+
+
+def load_thumbnail(observation_id, db_path=None):
+    with closing(connect(db_path)) as conn:
+        row = conn.execute("SELECT thumbnail FROM observation_images WHERE observation_id = ?", (observation_id,)).fetchone()
+    return None if row is None else bytes(row["thumbnail"])
+
+
+def rebuild_rollups(conn):
+    # Recompute the daily rollups from the raw checklist rows
+    with conn:
+        conn.execute("DELETE FROM daily_rollups")
+        conn.execute(
+            "INSERT INTO daily_rollups (location, date, checklist, na, safe, unsafe)"
+            " SELECT COALESCE(o.location, ''), o.date, i.checklist,"
+            " SUM(i.status = 'N/A'), SUM(i.status = 'Safe'), SUM(i.status = 'Unsafe')"
+            " FROM observation_items i JOIN observations o ON o.id = i.observation_id"
+            " GROUP BY COALESCE(o.location, ''), o.date, i.checklist"
+        )
+
+
+def load_rollups(location=None, date_from=None, date_to=None, db_path=None):
+    # Daily N/A/Safe/Unsafe counts per site and checklist item, read from the rollup table only
+    conditions, params = [], []
+    if location:
+        conditions.append("location = ?")
+        params.append(location)
+    if date_from:
+        conditions.append("date >= ?")
+        params.append(str(date_from))
+    if date_to:
+        conditions.append("date <= ?")
+        params.append(str(date_to))
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    with closing(connect(db_path)) as conn:
+        rollups = pd.read_sql_query(
+            f"SELECT location, date, checklist, na, safe, unsafe FROM daily_rollups {where} ORDER BY date",
+            conn, params=params,
+        )
+    rollups["date"] = pd.to_datetime(rollups["date"])
+    return rollups
+
+
+def rollup_locations(db_path=None):
+    with closing(connect(db_path)) as conn:
+        return [row[0] for row in conn.execute("SELECT DISTINCT location FROM daily_rollups ORDER BY location")]
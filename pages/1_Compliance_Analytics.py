@@ -0,0 +1,56 @@
+import streamlit as st
+from datetime import datetime, timedelta
+
+from detection import PPE_OPTIONS
+from observation_store import load_rollups, rollup_locations
+
+st.set_page_config(page_title="Compliance Analytics", layout="wide")
+
+st.markdown(
+    """<div style="text-align: center; font-size: 28px; font-weight: bold; border: 3px solid black; padding: 10px; margin-bottom: 10px;  background-color: lightgray;">Compliance Analytics
+        </div>
+    """, unsafe_allow_html=True
+)
+
+# Filters
+with st.sidebar:
+    st.header("Filters")
+    site = st.selectbox("Site", ["All sites"] + rollup_locations())
+    today = datetime.now().date()
+    date_range = st.date_input("Date range", value=(today - timedelta(days=90), today))
+    period = st.radio("Group by", options=["Day", "Week", "Month"], index=1, horizontal=True)
+
+date_from, date_to = (date_range + (today,))[:2] if isinstance(date_range, tuple) else (date_range, date_range)
+
+# Only the pre-aggregated daily counts are read, never the individual observations
+rollups = load_rollups(location=None if site == "All sites" else site, date_from=date_from, date_to=date_to)
+if rollups.empty:
+    st.info("No saved observations in this range yet. Reports generated in the app are added here automatically.")
+    st.stop()
+
+# Compliance = Safe / (Safe + Unsafe); N/A items are left out
+rollups["period"] = rollups["date"].dt.to_period({"Day": "D", "Week": "W", "Month": "M"}[period]).dt.start_time
+counts = rollups.groupby(["period", "checklist"])[["na", "safe", "unsafe"]].sum()
+rates = 100.0 * counts["safe"] / (counts["safe"] + counts["unsafe"])
+trend = rates.unstack("checklist").reindex(columns=[c for c in PPE_OPTIONS if c in rates.index.get_level_values("checklist")])
+
+totals = rollups[["safe", "unsafe"]].sum()
+col1, col2, col3 = st.columns(3)
+col1.metric("Checked items", int(totals["safe"] + totals["unsafe"]))
+col2.metric("Unsafe items", int(totals["unsafe"]))
+col3.metric("Compliance", f"{100.0 * totals['safe'] / max(totals['safe'] + totals['unsafe'], 1):.1f}%")
+
+st.subheader(f"Compliance rate per PPE item (%), by {period.lower()}")
+st.line_chart(trend)
+
+col1, col2 = st.columns(2)
+with col1:
+    st.subheader("Per PPE item")
+    per_item = rollups.groupby("checklist")[["na", "safe", "unsafe"]].sum().reindex(PPE_OPTIONS).dropna()
+    per_item["compliance %"] = (100.0 * per_item["safe"] / (per_item["safe"] + per_item["unsafe"])).round(1)
+    st.dataframe(per_item.rename(columns={"na": "N/A", "safe": "Safe", "unsafe": "Unsafe"}), use_container_width=True)
+with col2:
+    st.subheader("Per site")
+    per_site = rollups.groupby("location")[["safe", "unsafe"]].sum()
+    per_site["compliance %"] = (100.0 * per_site["safe"] / (per_site["safe"] + per_site["unsafe"])).round(1)
+    st.bar_chart(per_site["compliance %"])
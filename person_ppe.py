@@ -0,0 +1,167 @@
+import os
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+from detection import PROFILE, detect_cached
+from model_registry import get_model
+
+# Optional COCO-style detector used to find the workers themselves (its "person" class).
+# Without it, workers come from a "person" class of the PPE model or from grouping PPE boxes.
+PERSON_WEIGHTS = os.environ.get("BANTAI_PERSON_WEIGHTS")
+
+PERSON_CLASS = "person"
+MIN_OVERLAP = 0.5      # Share of a PPE box that must lie inside a worker's box
+PERSON_MARGIN = 0.1    # Worker boxes are grown by this fraction (gloves and shoes stick out)
+# Without person boxes, each PPE box stands for a column-shaped part of a worker: it is grown
+# sideways by COLUMN_WIDTH and up/down by COLUMN_HEIGHT times the typical PPE box size of the
+# frame, so a hairnet reaches the gloves and the gloves reach the shoes of the same worker
+COLUMN_WIDTH = 0.75
+COLUMN_HEIGHT = 4.0
+
+
+class BoxGrid:
+    # Uniform grid over boxes: each box is listed in every cell it overlaps, so the
+    # overlap candidates of a query box come from a few cells instead of from all boxes
+    def __init__(self, boxes, cell_size):
+        self.cell_size = max(float(cell_size), 1.0)
+        self.cells = defaultdict(list)
+        for i, (x1, y1, x2, y2) in enumerate(self._cell_ranges(boxes)):
+            for cx in range(x1, x2 + 1):
+                for cy in range(y1, y2 + 1):
+                    self.cells[(cx, cy)].append(i)
+
+    def _cell_ranges(self, boxes):
+        return np.floor(np.asarray(boxes, dtype=np.float64).reshape(-1, 4) / self.cell_size).astype(np.int64).tolist()
+
+    def candidate_pairs(self, boxes):
+        # (query index, box index) arrays for every query box and grid box sharing a cell
+        queries, found = [], []
+        for q, (x1, y1, x2, y2) in enumerate(self._cell_ranges(boxes)):
+            hits = set()
+            for cx in range(x1, x2 + 1):
+                for cy in range(y1, y2 + 1):
+                    hits.update(self.cells.get((cx, cy), ()))
+            queries.extend([q] * len(hits))
+            found.extend(hits)
+        return np.asarray(queries, dtype=np.intp), np.asarray(found, dtype=np.intp)
+
+
+def expand_boxes(boxes, margin):
+    size = np.concatenate([boxes[:, 2:] - boxes[:, :2]] * 2, axis=1)
+    return boxes + size * margin * np.array([-1, -1, 1, 1])
+
+
+def overlap_fraction(a, b):
+    # Share of each box in `a` covered by the box in `b` on the same row
+    width = np.clip(np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0]), 0, None)
+    height = np.clip(np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1]), 0, None)
+    area = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    return width * height / np.maximum(area, 1e-6)
+
+
+def assign_to_people(person_boxes, ppe_boxes, min_overlap=MIN_OVERLAP, margin=PERSON_MARGIN):
+    # Index of the worker each PPE box belongs to (-1 if none): the worker box that
+    # covers the largest share of it. Only grid neighbours are compared.
+    assignment = np.full(len(ppe_boxes), -1, dtype=np.intp)
+    if len(person_boxes) == 0 or len(ppe_boxes) == 0:
+        return assignment
+
+    grown = expand_boxes(person_boxes, margin)
+    cell_size = np.median((grown[:, 2:] - grown[:, :2]).max(axis=1))
+    ppe_index, person_index = BoxGrid(grown, cell_size).candidate_pairs(ppe_boxes)
+    if len(ppe_index) == 0:
+        return assignment
+
+    score = overlap_fraction(ppe_boxes[ppe_index], grown[person_index])
+    keep = score >= min_overlap
+    ppe_index, person_index, score = ppe_index[keep], person_index[keep], score[keep]
+
+    # Best worker per PPE box: sort by box, then by descending score, and take the first of each box
+    order = np.lexsort((-score, ppe_index))
+    boxes, first = np.unique(ppe_index[order], return_index=True)
+    assignment[boxes] = person_index[order][first]
+    return assignment
+
+
+def cluster_people(ppe_boxes, column_width=COLUMN_WIDTH, column_height=COLUMN_HEIGHT):
+    # Worker boxes guessed from PPE boxes alone: boxes whose worker columns touch are
+    # grouped (connected components) and each group's outline is one worker. The column
+    # size comes from the median PPE box, not from each box, so small items such as
+    # gloves reach as far as large ones.
+    if len(ppe_boxes) == 0:
+        return np.zeros((0, 4), dtype=np.float32)
+
+    unit = np.median((ppe_boxes[:, 2:] - ppe_boxes[:, :2]).max(axis=1))
+    grown = ppe_boxes + unit * np.array([-column_width, -column_height, column_width, column_height])
+    cell_size = np.median((grown[:, 2:] - grown[:, :2]).max(axis=1))
+    a, b = BoxGrid(grown, cell_size).candidate_pairs(grown)
+    touching = (a < b) & (overlap_fraction(grown[a], grown[b]) > 0)
+
+    parent = list(range(len(ppe_boxes)))
+
+    def root(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in zip(a[touching].tolist(), b[touching].tolist()):
+        parent[root(i)] = root(j)
+
+    _, labels = np.unique([root(i) for i in range(len(ppe_boxes))], return_inverse=True)
+    people = np.zeros((labels.max() + 1, 4), dtype=np.float32)
+    people[:, :2] = np.inf
+    people[:, 2:] = -np.inf
+    np.minimum.at(people[:, :2], labels, ppe_boxes[:, :2])
+    np.maximum.at(people[:, 2:], labels, ppe_boxes[:, 2:])
+    return people
+
+
+def person_detector():
+    return get_model(PERSON_WEIGHTS) if PERSON_WEIGHTS else None
+
+
+def detects_people(names, person_model=None):
+    # Whether worker boxes come from a detector rather than from grouping PPE boxes
+    return person_model is not None or PERSON_CLASS in names.values()
+
+
+def find_people(image, detections, names, person_model=None):
+    # Worker boxes and a mask of the PPE detections (everything that is not a person box)
+    is_person = np.array([names[int(c)] == PERSON_CLASS for c in detections.cls], dtype=bool)
+    if is_person.any():
+        return detections.xyxy[is_person], ~is_person
+
+    if person_model is not None and image is not None:
+        person_ids = [k for k, v in person_model.names.items() if v == PERSON_CLASS]
+        people = detect_cached(person_model, image, classes=person_ids)
+        if len(people.xyxy):
+            return people.xyxy, ~is_person
+
+    return cluster_people(detections.xyxy), ~is_person
+
+
+def person_compliance(detections, names, sections, image=None, person_model=None):
+    # Per-worker PPE checklist and per-item counts of safe/unsafe workers
+    person_boxes, is_ppe = find_people(image, detections, names, person_model)
+    ppe_boxes, ppe_cls = detections.xyxy[is_ppe], detections.cls[is_ppe]
+    assignment = assign_to_people(person_boxes, ppe_boxes)
+
+    # Checklist rows satisfied per worker: OR of the rows of every PPE box assigned to them
+    present = np.zeros((len(person_boxes), len(PROFILE.options)), dtype=bool)
+    assigned = assignment >= 0
+    np.logical_or.at(present, assignment[assigned], PROFILE.id_lookup(names)[ppe_cls[assigned]])
+    statuses = PROFILE.statuses(present, sections)
+
+    workers = pd.DataFrame(statuses, columns=PROFILE.ppe_items)
+    workers.index = [f"Worker {i + 1}" for i in range(len(person_boxes))]
+    workers.index.name = "Worker"
+    workers["Compliant"] = np.where((statuses == "Unsafe").any(axis=1), "No", "Yes")
+
+    counts = pd.DataFrame({
+        "Safe workers": (statuses == "Safe").sum(axis=0),
+        "Unsafe workers": (statuses == "Unsafe").sum(axis=0),
+    }, index=PROFILE.ppe_items)
+    return workers, counts, person_boxes
@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+# Checklist rows and the detector classes that satisfy them; set BANTAI_PPE_PROFILE to use another site's profile
+PROFILE_PATH = os.environ.get("BANTAI_PPE_PROFILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "ppe_profile.json"))
+
+
+class PPEProfile:
+    # A PPE checklist compiled for vectorized evaluation: every detector class maps to a
+    # boolean row of checklist items it satisfies, so a set of detections is checked with
+    # one fancy-indexing pass instead of one membership test per checklist row
+    def __init__(self, items, name="Custom"):
+        if not items:
+            raise ValueError("A PPE profile needs at least one checklist item")
+        self.name = name
+        self.options = [item["checklist"] for item in items]
+        self.ppe_items = [item["ppe"] for item in items]
+        self.sections = np.array([item["section"] for item in items])
+        self.section_names = list(dict.fromkeys(self.sections.tolist()))
+        self.section_of = dict(zip(self.options, self.sections.tolist()))
+
+        # Profile classes -> checklist rows
+        self.class_names = list(dict.fromkeys(c for item in items for c in item["classes"]))
+        self.class_index = {name: k for k, name in enumerate(self.class_names)}
+        self.class_rows = np.zeros((len(self.class_names), len(items)), dtype=bool)
+        for row, item in enumerate(items):
+            self.class_rows[[self.class_index[c] for c in item["classes"]], row] = True
+
+        self._id_lookups = {}
+        self._lock = threading.Lock()
+
+    def id_lookup(self, names):
+        # Model class id -> checklist rows, built once per model class list.
+        # Classes the profile does not know map to an all-False row.
+        key = tuple(sorted((int(k), v) for k, v in names.items()))
+        with self._lock:
+            lookup = self._id_lookups.get(key)
+            if lookup is None:
+                lookup = np.zeros((max(k for k, _ in key) + 1 if key else 0, len(self.options)), dtype=bool)
+                for class_id, class_name in key:
+                    if class_name in self.class_index:
+                        lookup[class_id] = self.class_rows[self.class_index[class_name]]
+                self._id_lookups[key] = lookup
+        return lookup
+
+    def present_from_ids(self, class_ids, names):
+        # Checklist rows satisfied by the detected class ids (any number of boxes)
+        return self.id_lookup(names)[np.asarray(class_ids, dtype=np.intp)].any(axis=0)
+
+    def present_from_names(self, class_names):
+        known = [self.class_index[c] for c in set(class_names) if c in self.class_index]
+        return self.class_rows[known].any(axis=0)
+
+    def statuses(self, present, sections):
+        # "Safe"/"Unsafe"/"N/A" per checklist row; `present` may also be (observations, rows)
+        in_section = np.isin(self.sections, list(sections))
+        return np.where(in_section, np.where(present, "Safe", "Unsafe"), "N/A")
+
+
+def profile_from_dict(data):
+    return PPEProfile(data["items"], name=data.get("name", "Custom"))
+
+
+@lru_cache(maxsize=None)
+def load_profile(path=PROFILE_PATH):
+    with open(path, encoding="utf-8") as f:
+        return profile_from_dict(json.load(f))
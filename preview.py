@@ -0,0 +1,103 @@
+import io
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+from detection import Detections
+
+PREVIEW_SIZE = 800       # Longest side of display previews (twice the 400 px columns, for sharp HiDPI screens)
+DEFAULT_INPUT_SIZE = 640
+LETTERBOX_COLOR = (114, 114, 114)  # Same padding grey as YOLO's own letterbox
+MAX_PREPARED = 16
+
+_prepared = OrderedDict()  # (upload id, input size) -> prepared upload
+_lock = threading.Lock()
+
+
+def model_input_size(model):
+    # Square input size the model was trained at (ultralytics keeps it in `overrides`)
+    size = getattr(model, "overrides", {}).get("imgsz", DEFAULT_INPUT_SIZE)
+    return int(size[0] if isinstance(size, (list, tuple)) else size)
+
+
+def letterbox(image, size):
+    # Resize to fit a size x size square without distortion and pad the rest.
+    # Returns the square image, the scale and the (x, y) padding.
+    height, width = image.shape[:2]
+    ratio = min(size / width, size / height)
+    new_width, new_height = round(width * ratio), round(height * ratio)
+    resized = cv2.resize(image, (new_width, new_height), interpolation=cv2.INTER_AREA if ratio < 1 else cv2.INTER_LINEAR)
+    pad_x, pad_y = (size - new_width) // 2, (size - new_height) // 2
+    boxed = np.full((size, size, 3), LETTERBOX_COLOR, dtype=image.dtype)
+    boxed[pad_y:pad_y + new_height, pad_x:pad_x + new_width] = resized
+    return boxed, ratio, (pad_x, pad_y)
+
+
+def scale_detections(detections, scale, offset=(0.0, 0.0)):
+    # Boxes in another coordinate system: (xyxy - offset) * scale
+    offset = np.array(offset * 2, dtype=np.float32)
+    return Detections((detections.xyxy - offset) * np.float32(scale), detections.cls, detections.conf)
+
+
+def load_full_image(data):
+    # Full-resolution RGB pixels of an uploaded file's bytes, only needed when the annotated original is exported
+    return np.array(ImageOps.exif_transpose(Image.open(io.BytesIO(data))).convert("RGB"))
+
+
+def prepare_upload(uploaded_file, input_size=DEFAULT_INPUT_SIZE):
+    # Preview and model input for an uploaded photo, made once per upload. The decoded
+    # full-size image is dropped straight away; only the two small arrays are kept.
+    key = (getattr(uploaded_file, "file_id", None) or uploaded_file.name, uploaded_file.size, input_size)
+    with _lock:
+        prepared = _prepared.get(key)
+        if prepared is not None:
+            _prepared.move_to_end(key)
+            return prepared
+
+    uploaded_file.seek(0)
+    image = Image.open(uploaded_file)
+    full_width = image.size[0]
+    # JPEGs can be decoded directly at 1/2, 1/4 or 1/8 scale when that is still large enough
+    image.draft("RGB", (max(input_size, PREVIEW_SIZE),) * 2)
+    full_scale = full_width / image.size[0]
+    pixels = np.array(ImageOps.exif_transpose(image).convert("RGB"))
+
+    model_input, ratio, pad = letterbox(pixels, input_size)
+    preview_scale = min(1.0, PREVIEW_SIZE / max(pixels.shape[:2]))
+    if preview_scale < 1:
+        preview = cv2.resize(pixels, None, fx=preview_scale, fy=preview_scale, interpolation=cv2.INTER_AREA)
+    else:
+        preview = pixels
+
+    prepared = {
+        "key": key,
+        "input": model_input,
+        "preview": preview,
+        # Coordinate systems: model input --(pad, ratio)--> decoded pixels --full_scale--> original,
+        # decoded pixels --preview_scale--> preview
+        "input_ratio": ratio,
+        "input_pad": pad,
+        "full_scale": full_scale,
+        "preview_scale": preview_scale,
+    }
+    with _lock:
+        _prepared[key] = prepared
+        while len(_prepared) > MAX_PREPARED:
+            _prepared.popitem(last=False)
+    return prepared
+
+
+def detections_in_decoded(prepared, detections):
+    # Model-input boxes (letterboxed) in the coordinates of the decoded upload
+    return scale_detections(detections, 1.0 / prepared["input_ratio"], prepared["input_pad"])
+
+
+def detections_in_preview(prepared, detections):
+    return scale_detections(detections_in_decoded(prepared, detections), prepared["preview_scale"])
+
+
+def detections_in_full(prepared, detections):
+    return scale_detections(detections_in_decoded(prepared, detections), prepared["full_scale"])
@@ -0,0 +1,340 @@
+import io
+from collections import OrderedDict
+from functools import lru_cache
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.lib import colors
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.pdfgen import canvas
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Table, TableStyle
+from reportlab.platypus import Frame, Spacer
+
+from detection import PROFILE, checklist_status
+
+
+# Paragraph styles, built once when the module is imported
+STYLES = getSampleStyleSheet()
+TITLE_STYLE = ParagraphStyle(
+    name='Title',
+    fontSize=18,
+    leading=22,
+    alignment=1,  # Center alignment
+    borderWidth=2,  # Add a 2-point border
+    borderPadding=4,
+    backColor=colors.darkgrey,
+    borderColor=colors.black,
+)
+PARA_STYLE = ParagraphStyle(
+    name='Para',
+    fontSize=12,
+    leading=16,
+    alignment=4,
+    borderWidth=1,  # Add a 1-point border
+    borderColor=colors.black,
+    backColor=colors.lightgrey,
+    borderPadding=4,
+)
+INSTRUCTION_STYLE = ParagraphStyle(
+    name='Instruction',
+    fontSize=11,
+    leading=16,
+    alignment=4,
+    fontName='Helvetica-Oblique',
+    borderWidth=1,  # Add a 1-point border
+    borderColor=colors.black,
+    backColor=colors.lightgrey,
+    borderPadding=4,
+)
+HEADING_STYLE = STYLES['Heading2']
+# Define a custom style for date, time, and location
+HIGHLIGHT_STYLE = ParagraphStyle(
+    name='Highlight',
+    parent=STYLES['Normal'],  # Inherit from the normal style
+    fontSize=14,              # Larger font size
+    textColor=colors.darkblue,  # Dark blue text color
+    fontName='Helvetica-Bold',  # Bold font
+    spaceAfter=12,            # Add space after the paragraph
+)
+
+
+def generate_pdf_report(date, time, location, ppe_df, description, intervention, positive_behaviour, near_miss, supervisor_name):
+    # Regenerating a report with unchanged inputs returns the cached PDF bytes
+    ppe_data = (tuple(ppe_df.columns), tuple(tuple(row) for row in ppe_df.values.tolist()))
+    return render_pdf_report(date, time, location, ppe_data, description, intervention, positive_behaviour, near_miss, supervisor_name)
+
+
+@lru_cache(maxsize=32)
+def render_pdf_report(date, time, location, ppe_data, description, intervention, positive_behaviour, near_miss, supervisor_name):
+    # Build the PDF in memory instead of a temporary file
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    columns, rows = ppe_data
+    content = observation_card(date, time, location, columns, rows, description, intervention, positive_behaviour, near_miss, supervisor_name)
+
+    # Build the PDF
+    doc.build(content)
+
+    # Return the PDF file contents
+    return buffer.getvalue()
+
+
+def observation_card(date, time, location, columns, rows, description, intervention, positive_behaviour, near_miss, supervisor_name):
+    # Create a list to hold the content of the PDF
+    content = []
+
+    # Add title
+    content.append(Paragraph("Safety Observation Card", TITLE_STYLE))
+
+    # Add a spacer to create some space
+    content.append(Spacer(1, 12))  # 1 inch, 12 points
+
+    # Add instructions
+    content.append(Paragraph("Instructions: The Safety Observation Card instructions involve informing the worker and completing the checklist prior to observation. Post-observation, review positive safety behaviors and discuss areas for improvement.", INSTRUCTION_STYLE))
+
+    # Add a spacer to create some space
+    content.append(Spacer(1, 12))  # 1 inch, 12 points
+
+    # Add date, time, and location with emojis and custom style
+    content.append(Paragraph(f"📅 <b>Date:</b> {date}", HIGHLIGHT_STYLE))
+    content.append(Spacer(1, 12))  # Add a spacer for better spacing
+
+    content.append(Paragraph(f"⏰ <b>Time:</b> {time}", HIGHLIGHT_STYLE))
+    content.append(Spacer(1, 12))  # Add a spacer for better spacing
+
+    content.append(Paragraph(f"📍 <b>Location:</b> {location}", HIGHLIGHT_STYLE))
+    content.append(Spacer(1, 12))  # Add a spacer for better spacing
+    # Add a spacer to create some space
+    content.append(Spacer(1, 12))  # 1 inch, 12 points
+
+    # Add PPE checklist table
+    content.append(Paragraph("Personal Protective Equipment Checklist", TITLE_STYLE))
+
+    # Add a spacer to create some space
+    content.append(Spacer(1, 12))  # 1 inch, 12 points
+
+    # Convert the DataFrame to a list of lists for the table
+    ppe_data_with_numbers = [["No."] + list(columns)] + [[i+1] + list(row) for i, row in enumerate(rows)]
+
+    # Create the table
+    ppe_table = Table(ppe_data_with_numbers, colWidths=['10%'] + ['25%'] + ['25%'] + ['*'] * (len(ppe_data_with_numbers[0]) - 4), rowHeights=[25] * len(ppe_data_with_numbers))
+    ppe_table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey), 
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke), 
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'), 
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'), 
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12), 
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige), 
+        ('GRID', (0, 0), (-1, -1), 1, colors.black), 
+        ('FONTSIZE', (0, 0), (-1, -1), 12), 
+    ]))
+    content.append(ppe_table)
+    # Add observation description
+    content.append(Paragraph("Observation Description:", HEADING_STYLE))
+    content.append(Paragraph(description, PARA_STYLE))
+
+    # Add recommended interventions
+    content.append(Paragraph("Recommended Interventions:", HEADING_STYLE))
+    content.append(Paragraph(intervention, PARA_STYLE))
+
+    # Add positive safety behaviors
+    content.append(Paragraph("Positive Safety Behaviors:", HEADING_STYLE))
+    content.append(Paragraph(positive_behaviour, PARA_STYLE))
+
+    # Add identified near misses
+    content.append(Paragraph("Identified Near Misses:", HEADING_STYLE))
+    content.append(Paragraph(near_miss, PARA_STYLE))
+
+    # Add supervisor name
+    content.append(Paragraph("Supervisor Name:", HEADING_STYLE))
+    content.append(Paragraph(supervisor_name, PARA_STYLE))
+
+    return content
+
+
+# Page area used by the bulk report (same margins as SimpleDocTemplate's defaults)
+PAGE_MARGIN = 72
+SUMMARY_ROWS_PER_TABLE = 40
+
+SUMMARY_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+])
+
+
+def item_counts(ppe_df):
+    # Number of Safe and Unsafe checklist items in one observation
+    return int((ppe_df["Safe"] == "☑").sum()), int((ppe_df["Unsafe"] == "☑").sum())
+
+
+def compliance_rate(safe, unsafe):
+    return f"{100.0 * safe / (safe + unsafe):.1f}%" if safe + unsafe else "-"
+
+
+def draw_flowables(pdf, flowables):
+    # Lay the flowables out on as many pages as needed, then start a new page.
+    # Tables that do not fit in the space left are split across pages (header repeated).
+    # Only this list is held in memory; it is consumed while drawing.
+    width, height = A4
+    while flowables:
+        frame = Frame(PAGE_MARGIN, PAGE_MARGIN, width - 2 * PAGE_MARGIN, height - 2 * PAGE_MARGIN)
+        drawn = 0
+        while flowables:
+            if frame.add(flowables[0], pdf, trySplit=1):
+                flowables.pop(0)
+                drawn += 1
+                continue
+            parts = frame.split(flowables[0], pdf)
+            if len(parts) > 1 and frame.add(parts[0], pdf, trySplit=1):
+                flowables[0:1] = parts[1:]
+                drawn += 1
+            break
+        pdf.showPage()
+        if not drawn:
+            raise ValueError(f"{type(flowables[0]).__name__} does not fit on a page and cannot be split")
+
+
+def summary_flowables(sites, observations_list):
+    content = [Paragraph("Safety Observation Summary", TITLE_STYLE), Spacer(1, 12)]
+
+    # Per-site compliance rates
+    content.append(Paragraph("Compliance by Site", HEADING_STYLE))
+    site_rows = [["Location", "Observations", "Safe items", "Unsafe items", "Compliance"]]
+    total = [0, 0, 0]
+    for location, (count, safe, unsafe) in sites.items():
+        site_rows.append([location, count, safe, unsafe, compliance_rate(safe, unsafe)])
+        total = [total[0] + count, total[1] + safe, total[2] + unsafe]
+    site_rows.append(["All sites", total[0], total[1], total[2], compliance_rate(total[1], total[2])])
+    site_table = Table(site_rows, repeatRows=1)
+    site_table.setStyle(SUMMARY_TABLE_STYLE)
+    content += [site_table, Spacer(1, 12)]
+
+    # One line per observation, in several tables so long lists lay out quickly
+    # (each table is still split across pages by draw_flowables)
+    content.append(Paragraph("Observations", HEADING_STYLE))
+    header = ["No.", "Date", "Time", "Location", "Supervisor", "Safe", "Unsafe"]
+    for start in range(0, len(observations_list), SUMMARY_ROWS_PER_TABLE):
+        chunk = observations_list[start:start + SUMMARY_ROWS_PER_TABLE]
+        table = Table([header] + chunk, repeatRows=1)
+        table.setStyle(SUMMARY_TABLE_STYLE)
+        content.append(table)
+    return content
+
+
+def generate_bulk_report(observations, output):
+    # Compile many observations into one PDF: a summary with per-site compliance rates
+    # followed by one Safety Observation Card per observation.
+    # `observations` is a list of dicts with the generate_pdf_report arguments, or a
+    # function returning a fresh iterator over them (it is read twice: once for the
+    # summary and once for the cards). `output` is a file name or a binary file object.
+    records = observations if callable(observations) else (lambda: observations)
+
+    # First pass: only the numbers needed for the summary are kept
+    sites = OrderedDict()
+    observations_list = []
+    for number, record in enumerate(records(), start=1):
+        safe, unsafe = item_counts(record["ppe_df"])
+        count, site_safe, site_unsafe = sites.get(record["location"], (0, 0, 0))
+        sites[record["location"]] = (count + 1, site_safe + safe, site_unsafe + unsafe)
+        observations_list.append([number, record["date"], record["time"], record["location"], record["supervisor_name"], safe, unsafe])
+
+    pdf = canvas.Canvas(output, pagesize=A4)
+    draw_flowables(pdf, summary_flowables(sites, observations_list))
+    del observations_list
+
+    # Second pass: build and draw each card, then let its flowables go
+    for record in records():
+        ppe_df = record["ppe_df"]
+        rows = ppe_df.values.tolist()
+        draw_flowables(pdf, observation_card(
+            record["date"], record["time"], record["location"], ppe_df.columns.tolist(), rows,
+            record["description"], record["intervention"], record["positive_behaviour"],
+            record["near_miss"], record["supervisor_name"],
+        ))
+
+    pdf.save()
+    return {location: {"observations": count, "safe": safe, "unsafe": unsafe, "compliance": compliance_rate(safe, unsafe)}
+            for location, (count, safe, unsafe) in sites.items()}
+
+
+# Generate descriptions, interventions, positive behaviour and near misses from the PPE table
+# Narrative rules: each report field lists the in-section checklist items with the given
+# status, phrased with `item`, inside the `found` sentence; `none` is used when no item matches
+NARRATIVE_RULES = {
+    "description": {
+        "status": "N/A",
+        "item": "{item} status unknown",
+        "found": "During the site observation, workers were observed utilizing the following personal protective equipment (PPE): "
+                 "{items}. However, it is essential to ensure that all required PPE is consistently worn to maintain safety standards.",
+        "none": "All personnel were observed to be fully compliant with the required personal protective equipment (PPE) protocols. "
+                "This adherence to safety standards is commendable and contributes to a safer work environment.",
+    },
+    "intervention": {
+        "status": "Unsafe",
+        "item": "{item_lower} should be provided",
+        "found": "The following interventions are required to address PPE non-compliance: "
+                 "{items}. Immediate action is recommended to mitigate potential hazards and ensure worker safety.",
+        "none": "No interventions are currently required. All personnel are adhering to the prescribed PPE protocols, "
+                "which reflects a strong commitment to workplace safety.",
+    },
+    "positive_behaviour": {
+        "status": "Safe",
+        "item": "{item}",
+        "found": "Positive safety behaviours were observed, including the proper use of the following PPE: "
+                 "{items}. This demonstrates a proactive approach to safety and should be encouraged.",
+        "none": "No specific positive behaviours related to PPE usage were recorded during this observation. "
+                "It is recommended to reinforce the importance of PPE compliance through regular training and reminders.",
+    },
+    "near_miss": {
+        "status": "Unsafe",
+        "item": "Potential risk due to missing {item_lower}",
+        "found": "The following near misses were identified due to missing or improper use of PPE: "
+                 "{items}. These incidents highlight potential risks that could lead to injuries or accidents. "
+                 "Corrective measures should be implemented immediately.",
+        "none": "No near misses related to PPE usage were identified during this observation. "
+                "This indicates a strong safety culture and adherence to PPE protocols.",
+    },
+}
+
+
+def build_narratives_batch(ppe_tables, sections):
+    # Narratives for many observations at once, one dict per PPE table. `sections` is either
+    # one list of checklist sections for all tables or one list per table.
+    ppe_tables = list(ppe_tables)
+    if not ppe_tables:
+        return []
+
+    # All checklist rows in one frame; every rule is then a column mask over it
+    rows = pd.concat(ppe_tables, keys=range(len(ppe_tables)), names=["observation", None]).reset_index(level=0)
+    observation = rows["observation"].to_numpy()
+    # Section from the PPE profile; rows saved under an older profile fall back to the label's first word
+    section = rows["Checklist"].map(PROFILE.section_of).fillna(rows["Checklist"].str.split(" ", n=1).str[0])
+    if sections and not isinstance(sections[0], str):
+        pairs = [(i, s) for i, table_sections in enumerate(sections) for s in table_sections]
+        allowed = pd.MultiIndex.from_arrays([[i for i, _ in pairs], [s for _, s in pairs]])
+        in_section = pd.MultiIndex.from_arrays([observation, section]).isin(allowed)
+    else:
+        in_section = section.isin(sections).to_numpy()
+    status = checklist_status(rows)
+
+    narratives = [{} for _ in ppe_tables]
+    for field, rule in NARRATIVE_RULES.items():
+        mask = in_section & (status == rule["status"])
+        checklist = rows["Checklist"][mask]
+        # Each distinct checklist label is phrased once, not once per row
+        phrases = {item: rule["item"].format(item=item, item_lower=item.lower()) for item in checklist.unique()}
+        items = checklist.map(phrases).groupby(observation[mask], sort=False).agg(", ".join)
+        for result in narratives:
+            result[field] = rule["none"]
+        for i, joined in items.items():
+            narratives[i][field] = rule["found"].format(items=joined)
+    return narratives
+
+
+def build_narratives(ppe_df, sections):
+    return build_narratives_batch([ppe_df], sections)[0]
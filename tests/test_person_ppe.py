@@ -0,0 +1,44 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("ultralytics")  # person_ppe loads the optional person detector through model_registry
+
+from detection import Detections
+from person_ppe import cluster_people, person_compliance
+
+NAMES = {0: "hairnet", 1: "goggles", 2: "mask", 3: "gloves", 4: "shoes", 5: "full-body suit"}
+
+
+def worker_boxes(x_offset=0):
+    # One worker in a 640x480 frame: hairnet, two gloves about 150 px lower, two shoes at the bottom
+    boxes = np.array([
+        [300, 60, 360, 100],   # hairnet
+        [250, 220, 290, 260],  # left glove
+        [370, 220, 410, 260],  # right glove
+        [280, 430, 320, 470],  # left shoe
+        [330, 430, 370, 470],  # right shoe
+    ], dtype=np.float32)
+    boxes[:, [0, 2]] += x_offset
+    return boxes, np.array([0, 3, 3, 4, 4])
+
+
+def test_single_worker_is_one_cluster():
+    boxes, _ = worker_boxes()
+    people = cluster_people(boxes)
+    assert len(people) == 1
+    np.testing.assert_allclose(people[0], [250, 60, 410, 470])
+
+
+def test_single_worker_checklist():
+    boxes, cls = worker_boxes()
+    detections = Detections(boxes, cls, np.full(len(cls), 0.9, dtype=np.float32))
+    workers, counts, _ = person_compliance(detections, NAMES, ["Head", "Hand", "Foot"])
+    assert len(workers) == 1
+    assert workers.iloc[0][["Hairnet", "Gloves", "Shoes"]].tolist() == ["Safe"] * 3
+    assert workers.iloc[0]["Compliant"] == "Yes"
+
+
+def test_workers_apart_are_separate():
+    left, _ = worker_boxes(-200)
+    right, _ = worker_boxes(200)
+    assert len(cluster_people(np.concatenate([left, right]))) == 2
@@ -0,0 +1,37 @@
+import io
+import re
+
+import pandas as pd
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from reporting import draw_flowables, generate_bulk_report, summary_flowables
+
+
+def drawn_text(flowables):
+    # Text drawn by the flowables, read from an uncompressed PDF
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4, pageCompression=0)
+    draw_flowables(pdf, flowables)
+    pdf.save()
+    return buffer.getvalue().decode("latin-1")
+
+
+def test_summary_keeps_every_observation_row():
+    rows = [[n, "2025-05-01", "08:00 AM", f"Site {n % 60:02d}", f"Supervisor {n:03d}", 3, 1] for n in range(1, 101)]
+    sites = {f"Site {k:02d}": (1, 3, 1) for k in range(60)}
+    text = drawn_text(summary_flowables(sites, rows))
+    assert sorted(set(re.findall(r"Supervisor (\d{3})", text))) == [f"{n:03d}" for n in range(1, 101)]
+    assert len(set(re.findall(r"\(Site (\d{2})\) Tj", text))) == 60
+    assert "All sites" in text
+
+
+def test_bulk_report_writes_summary_and_cards():
+    ppe_df = pd.DataFrame({"Checklist": ["Head Protection"], "PPE": ["Hairnet"],
+                           "N/A": ["☐"], "Safe": ["☑"], "Unsafe": ["☐"]}, index=[1])
+    record = dict(date="2025-05-01", time="08:00 AM", location="Site A", ppe_df=ppe_df, supervisor_name="M",
+                  description="", intervention="", positive_behaviour="", near_miss="")
+    output = io.BytesIO()
+    sites = generate_bulk_report([record] * 45, output)
+    assert sites["Site A"]["observations"] == 45
+    assert output.getvalue().startswith(b"%PDF")
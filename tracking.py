@@ -0,0 +1,188 @@
+import threading
+import warnings
+
+import cv2
+import numpy as np
+
+from detection import PROFILE, Detections
+from person_ppe import assign_to_people, detects_people, find_people
+
+TRACK_WIDTH = 320       # Optical flow runs on a grey frame downscaled to this width
+MATCH_IOU = 0.3         # Minimum overlap for a new worker box to continue an existing track
+MAX_MISSED = 5          # Detection rounds a track survives without being matched
+MIN_PRESENCE = 0.5      # Share of a worker's detection rounds an item must be seen in to count as worn
+MIN_ROUNDS = 2          # Detection rounds a worker must appear in to count for the session
+
+
+def iou_matrix(a, b):
+    # Intersection over union of every box in `a` with every box in `b`
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-6)
+
+
+def match_boxes(a, b, min_iou=MATCH_IOU):
+    # Greedy one-to-one matching, highest overlap first: list of (index in a, index in b)
+    if len(a) == 0 or len(b) == 0:
+        return []
+    iou = iou_matrix(a, b)
+    rows, cols = np.nonzero(iou >= min_iou)
+    matches, used_a, used_b = [], set(), set()
+    for k in np.argsort(-iou[rows, cols]).tolist():
+        i, j = int(rows[k]), int(cols[k])
+        if i not in used_a and j not in used_b:
+            matches.append((i, j))
+            used_a.add(i)
+            used_b.add(j)
+    return matches
+
+
+def track_grey(frame_rgb):
+    scale = min(1.0, TRACK_WIDTH / frame_rgb.shape[1])
+    grey = cv2.cvtColor(frame_rgb, cv2.COLOR_RGB2GRAY)
+    if scale < 1.0:
+        grey = cv2.resize(grey, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return grey, scale
+
+
+def shift_boxes(prev_grey, grey, boxes, scale):
+    # Move every box by the median optical flow of the corner features inside it
+    if len(boxes) == 0:
+        return boxes
+    points = cv2.goodFeaturesToTrack(prev_grey, maxCorners=300, qualityLevel=0.01, minDistance=5)
+    if points is None:
+        return boxes
+    moved, status, _ = cv2.calcOpticalFlowPyrLK(prev_grey, grey, points, None)
+    ok = status.ravel() == 1
+    start = points.reshape(-1, 2)[ok]
+    flow = moved.reshape(-1, 2)[ok] - start
+
+    small = boxes * scale
+    inside = (
+        (start[None, :, 0] >= small[:, None, 0]) & (start[None, :, 0] <= small[:, None, 2])
+        & (start[None, :, 1] >= small[:, None, 1]) & (start[None, :, 1] <= small[:, None, 3])
+    )
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # Boxes without features stay where they are
+        dx = np.nanmedian(np.where(inside, flow[None, :, 0], np.nan), axis=1)
+        dy = np.nanmedian(np.where(inside, flow[None, :, 1], np.nan), axis=1)
+    shift = np.nan_to_num(np.stack([dx, dy, dx, dy], axis=1)) / scale
+    return (boxes + shift).astype(np.float32)
+
+
+class SessionTracker:
+    # Follows workers across live frames and accumulates their PPE over the session.
+    # The model runs every `detect_every` frames; in between, the last detections are
+    # carried forward with optical flow. Workers are matched between detection rounds
+    # by box overlap, so each one keeps an id and a per-item count of rounds in which
+    # the item was seen on them. Workers are only tracked when the model detects people;
+    # otherwise the session checklist comes from frame-level counts.
+    def __init__(self, names, detect_every=5):
+        self.names = names
+        self.tracks_workers = detects_people(names)
+        self.detect_every = max(1, int(detect_every))
+        self.tracks = []
+        self._retired = []
+        self.rounds = 0
+        self.frames = 0
+        self.tracked_frames = 0
+        self.seen_counts = np.zeros(len(PROFILE.options), dtype=np.int64)  # Frame-level fallback
+        self.last_frame = None
+        self.last_detections = None
+        self._next_id = 1
+        self._prev_grey = None
+        self._scale = 1.0
+        self._lock = threading.Lock()
+
+    def needs_detection(self):
+        return self.last_detections is None or self.frames % self.detect_every == 0
+
+    def update(self, frame_rgb, detections):
+        # New model output: add this round to the frame-level counts and, when workers are tracked, to theirs
+        with self._lock:
+            lookup = PROFILE.id_lookup(self.names)
+            self.seen_counts += lookup[detections.cls].any(axis=0) if len(detections.cls) else 0
+            self.rounds += 1
+            if self.tracks_workers:
+                self._update_tracks(detections, lookup)
+
+            self._prev_grey, self._scale = track_grey(frame_rgb)
+            self._remember(frame_rgb, detections)
+        return detections
+
+    def _update_tracks(self, detections, lookup):
+        # Match this round's workers to the tracks and count the items seen on each of them
+        people, is_ppe = find_people(None, detections, self.names)
+        assignment = assign_to_people(people, detections.xyxy[is_ppe])
+        present = np.zeros((len(people), len(PROFILE.options)), dtype=bool)
+        assigned = assignment >= 0
+        np.logical_or.at(present, assignment[assigned], lookup[detections.cls[is_ppe][assigned]])
+
+        track_boxes = np.array([t["box"] for t in self.tracks], dtype=np.float32).reshape(-1, 4)
+        matched = {j: i for i, j in match_boxes(track_boxes, people)}
+        for track in self.tracks:
+            track["missed"] += 1
+        for j in range(len(people)):
+            if j in matched:
+                track = self.tracks[matched[j]]
+            else:
+                track = {"id": self._next_id, "rounds": 0, "counts": np.zeros(len(PROFILE.options), dtype=np.int64)}
+                self._next_id += 1
+                self.tracks.append(track)
+            track["box"] = people[j].astype(np.float32)
+            track["rounds"] += 1
+            track["missed"] = 0
+            track["counts"] += present[j]
+
+        # Workers out of view for too long stop being tracked but still count for the session
+        self._retired.extend(t for t in self.tracks if t["missed"] > MAX_MISSED)
+        self.tracks = [t for t in self.tracks if t["missed"] <= MAX_MISSED]
+
+    def track(self, frame_rgb):
+        # Frame between detection rounds: move the last boxes along with the image
+        with self._lock:
+            grey, scale = track_grey(frame_rgb)
+            d = self.last_detections
+            detections = Detections(shift_boxes(self._prev_grey, grey, d.xyxy, scale), d.cls, d.conf)
+            if self.tracks:
+                boxes = shift_boxes(self._prev_grey, grey, np.array([t["box"] for t in self.tracks], dtype=np.float32), scale)
+                for track, box in zip(self.tracks, boxes):
+                    track["box"] = box
+            self._prev_grey = grey
+            self.tracked_frames += 1
+            self._remember(frame_rgb, detections)
+        return detections
+
+    def _remember(self, frame_rgb, detections):
+        self.frames += 1
+        self.last_frame = frame_rgb.copy()  # The render stage draws on the original
+        self.last_detections = detections
+
+    def track_boxes(self):
+        with self._lock:
+            return [(t["id"], t["box"].copy()) for t in self.tracks]
+
+    def worker_statuses(self, sections, min_presence=MIN_PRESENCE, min_rounds=MIN_ROUNDS):
+        # {worker id: status per checklist row} over each worker's whole time in view.
+        # Workers seen in fewer than `min_rounds` detection rounds are treated as noise.
+        with self._lock:
+            return {
+                t["id"]: PROFILE.statuses(t["counts"] >= min_presence * t["rounds"], sections)
+                for t in self._retired + self.tracks if t["rounds"] >= min_rounds
+            }
+
+    def session_statuses(self, sections, min_presence=MIN_PRESENCE):
+        # Session checklist: an item is Safe only if every worker wore it; without
+        # identifiable workers, if it was seen in enough detection rounds
+        worker_statuses = list(self.worker_statuses(sections, min_presence).values())
+        if worker_statuses:
+            statuses = np.array(worker_statuses)
+            return np.where((statuses == "N/A").all(axis=0), "N/A",
+                            np.where((statuses == "Unsafe").any(axis=0), "Unsafe", "Safe"))
+        with self._lock:
+            return PROFILE.statuses(self.seen_counts >= min_presence * max(self.rounds, 1), sections)
@@ -0,0 +1,94 @@
+import hashlib
+import os
+import tempfile
+import threading
+
+# Uploaded files are stored once per content hash in this folder and shared by all sessions
+UPLOAD_DIR = os.path.join(tempfile.gettempdir(), "bantai_uploads")
+
+# Total size the store may use before the least recently used files are deleted
+MAX_STORE_BYTES = 2 * 1024 * 1024 * 1024
+CHUNK_SIZE = 8 * 1024 * 1024
+
+_lock = threading.Lock()
+# Upload id -> stored path, so reruns of the same upload skip hashing entirely
+_stored_uploads = {}
+
+
+def upload_id(uploaded_file):
+    # Streamlit gives every upload a stable id; older versions only have name and size
+    file_id = getattr(uploaded_file, "file_id", None) or getattr(uploaded_file, "id", None)
+    return file_id if file_id is not None else (uploaded_file.name, uploaded_file.size)
+
+
+def touch(path):
+    # Mark a stored file as recently used
+    os.utime(path, None)
+
+
+def store_upload(uploaded_file, max_bytes=MAX_STORE_BYTES):
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    key = upload_id(uploaded_file)
+
+    with _lock:
+        path = _stored_uploads.get(key)
+        if path is not None and os.path.exists(path):
+            touch(path)
+            return path
+
+    # Stream the upload to disk in chunks while hashing it, instead of read()-ing
+    # the whole file into a second in-memory copy
+    suffix = os.path.splitext(uploaded_file.name)[1].lower() or ".bin"
+    digest = hashlib.sha256()
+    fd, partial_path = tempfile.mkstemp(dir=UPLOAD_DIR, suffix=".part")
+    try:
+        uploaded_file.seek(0)
+        with os.fdopen(fd, "wb") as out:
+            for chunk in iter(lambda: uploaded_file.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+    except Exception:
+        os.remove(partial_path)
+        raise
+    finally:
+        uploaded_file.seek(0)
+
+    path = os.path.join(UPLOAD_DIR, digest.hexdigest() + suffix)
+    with _lock:
+        if os.path.exists(path):
+            # Same content uploaded before (possibly by another session)
+            os.remove(partial_path)
+            touch(path)
+        else:
+            os.replace(partial_path, path)
+        _stored_uploads[key] = path
+
+    evict_uploads(max_bytes=max_bytes, keep=path)
+    return path
+
+
+def evict_uploads(max_bytes=MAX_STORE_BYTES, keep=None):
+    # Delete least recently used files until the store fits in max_bytes
+    with _lock:
+        entries = []
+        for name in os.listdir(UPLOAD_DIR):
+            path = os.path.join(UPLOAD_DIR, name)
+            if name.endswith(".part") or not os.path.isfile(path):
+                continue
+            stat = os.stat(path)
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass  # Still open on some platforms; try again next time
+
+        for key in [k for k, p in _stored_uploads.items() if not os.path.exists(p)]:
+            del _stored_uploads[key]
@@ -0,0 +1,194 @@
+import random
+
+import cv2
+import pandas as pd
+
+from detection import detect_batch, detections_from_result
+
+try:
+    # Optional: PyAV can skip decoding of non-key frames, which makes the keyframe-only mode fast
+    import av
+except ImportError:
+    av = None
+
+
+def pick_frame_ids(total_frames, num_frames, seed=None):
+    # Sorted distinct frame indices; the same seed always gives the same indices
+    rng = random.Random(seed)
+    num_frames = min(num_frames, total_frames)
+    return sorted(rng.sample(range(total_frames), num_frames))
+
+
+def take_random_frames(video_path, num_frames=5, seed=None, keyframes_only=False):
+    if keyframes_only and av is not None:
+        return take_random_keyframes(video_path, num_frames=num_frames, seed=seed)
+
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    frames = []
+    if total_frames <= 0:
+        cap.release()
+        return frames
+
+    # Decode in a single forward pass: grab() the frames in between and only
+    # retrieve() (convert to BGR) the ones that were picked
+    position = 0
+    for frame_id in pick_frame_ids(total_frames, num_frames, seed):
+        while position < frame_id:
+            if not cap.grab():
+                break
+            position += 1
+        if position < frame_id:
+            break  # Frame count reported by the container was larger than the real one
+
+        ret, frame = cap.read()
+        position += 1
+        if ret:
+            frames.append(frame)
+    cap.release()
+    return frames
+
+
+def take_random_keyframes(video_path, num_frames=5, seed=None):
+    # Fast mode: decode only keyframes and keep a uniform random sample of them
+    # (reservoir sampling, so memory does not depend on clip length)
+    rng = random.Random(seed)
+    sample = []
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        stream.codec_context.skip_frame = "NONKEY"
+        for count, frame in enumerate(container.decode(stream)):
+            if len(sample) < num_frames:
+                sample.append((count, frame.to_ndarray(format="bgr24")))
+            else:
+                slot = rng.randint(0, count)
+                if slot < num_frames:
+                    sample[slot] = (count, frame.to_ndarray(format="bgr24"))
+
+    # Keep the frames in video order
+    return [frame for _, frame in sorted(sample, key=lambda item: item[0])]
+
+
+def keyframe_sampling_available():
+    return av is not None
+
+
+def iter_frames(video_path, stride=1):
+    # Stream (frame_index, frame) for every `stride`-th frame of the clip in one forward pass
+    cap = cv2.VideoCapture(video_path)
+    try:
+        frame_index = 0
+        while cap.grab():
+            if frame_index % stride == 0:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield frame_index, frame
+            frame_index += 1
+    finally:
+        cap.release()
+
+
+def video_properties(video_path):
+    cap = cv2.VideoCapture(video_path)
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    fps = cap.get(cv2.CAP_PROP_FPS) or 0.0
+    cap.release()
+    return total_frames, fps
+
+
+class ClassPresence:
+    # Running presence statistics of one detector class over the scanned frames.
+    # Gaps are measured in video frames, from the first frame the class was missing in
+    # to the frame it was seen again, so they never exceed the scanned span.
+    def __init__(self):
+        self.frames_present = 0
+        self.frames_scanned = 0
+        self.longest_gap = 0
+        self.gap_start = None
+        self.last_scanned = None
+        self.first_seen = None
+        self.last_seen = None
+
+    def update(self, frame_index, present):
+        self.frames_scanned += 1
+        self.last_scanned = frame_index
+        if present:
+            self.frames_present += 1
+            if self.gap_start is not None:
+                self.longest_gap = max(self.longest_gap, frame_index - self.gap_start)
+                self.gap_start = None
+            if self.first_seen is None:
+                self.first_seen = frame_index
+            self.last_seen = frame_index
+        elif self.gap_start is None:
+            self.gap_start = frame_index
+
+    @property
+    def fraction(self):
+        return self.frames_present / self.frames_scanned if self.frames_scanned else 0.0
+
+    @property
+    def max_gap(self):
+        # Longest run of frames without the class, including a trailing one up to the last scanned frame
+        if self.gap_start is None:
+            return self.longest_gap
+        return max(self.longest_gap, self.last_scanned + 1 - self.gap_start)
+
+
+def scan_video(model, video_path, stride=10, batch_size=8, progress=None):
+    # Run the detector over the whole clip and aggregate class presence over time.
+    # Only one batch of frames is held at a time, so memory does not grow with clip length.
+    total_frames, fps = video_properties(video_path)
+    presence = {name: ClassPresence() for name in model.names.values()}
+    batch_ids, batch_images = [], []
+    frames_scanned = 0
+
+    def flush():
+        results = detect_batch(model, batch_images, batch_size=batch_size)
+        for frame_index, result in zip(batch_ids, results):
+            found = {model.names[int(class_id)] for class_id in detections_from_result(result).cls}
+            for name, stats in presence.items():
+                stats.update(frame_index, name in found)
+        batch_ids.clear()
+        batch_images.clear()
+
+    for frame_index, frame in iter_frames(video_path, stride=stride):
+        batch_ids.append(frame_index)
+        batch_images.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        frames_scanned += 1
+        if len(batch_images) == batch_size:
+            flush()
+            if progress is not None and total_frames > 0:
+                progress(min(frame_index + 1, total_frames) / total_frames)
+    if batch_images:
+        flush()
+    if progress is not None:
+        progress(1.0)
+
+    return {
+        "presence": presence,
+        "frames_scanned": frames_scanned,
+        "total_frames": total_frames,
+        "fps": fps,
+        "stride": stride,
+    }
+
+
+def classes_present(scan, min_fraction=0.5):
+    # Classes seen in at least `min_fraction` of the scanned frames
+    return [name for name, stats in scan["presence"].items() if stats.frames_scanned and stats.fraction >= min_fraction]
+
+
+def presence_table(scan):
+    # Seconds per video frame (falls back to frames when the clip has no FPS)
+    seconds_per_frame = 1.0 / scan["fps"] if scan["fps"] else 1.0
+    rows = []
+    for name, stats in scan["presence"].items():
+        rows.append({
+            "Class": name,
+            "Present (% of frames)": round(100.0 * stats.fraction, 1),
+            "Longest gap (s)": round(stats.max_gap * seconds_per_frame, 1),
+            "First seen (s)": None if stats.first_seen is None else round(stats.first_seen * seconds_per_frame, 1),
+            "Last seen (s)": None if stats.last_seen is None else round(stats.last_seen * seconds_per_frame, 1),
+        })
+    return pd.DataFrame(rows).set_index("Class")